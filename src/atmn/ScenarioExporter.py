@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 
-from atmn.ScenarioLoader import ScenarioCollection
 import os
 import sys
-import pandas as pd
+import stat
 import argparse
 
+# Measurement types retrieved from a collection, one sheet or file each
+_SHEETS = ('demand', 'flow', 'pressure')
+
+# File extensions of the formats that write all measurements to a single file
+_SINGLE_FILE_EXTENSIONS = {'xlsx': '.xlsx', 'csvzip': '.zip'}
+
 def run(args):
     """
     Run the scenario export script with the given command line args
@@ -19,40 +24,259 @@ def run(args):
     leak_config_name = args.leak_config_name
     sensorconfig_name = args.sensorconfig_name
     sensorfault_config_name = args.sensorfault_config_name
-    output = args.output if args.output.endswith('.xlsx') else f'{args.output}.xlsx'
+    output_format = args.format
 
-    # Initialize scenario collection
-    if not os.path.exists(collection_path):
-        print(f'[ERROR] No collection found at "{collection_path}".')
-        sys.exit(1)
-    collection = ScenarioCollection(collection_path)
+    # Excel files and csv archives contain all measurements, the other formats get one file per measurement type
+    if output_format in _SINGLE_FILE_EXTENSIONS:
+        extension = _SINGLE_FILE_EXTENSIONS[output_format]
+        output = args.output if args.output.lower().endswith(extension) else f'{args.output}{extension}'
+        output_files = [output]
+    else:
+        extension = f'.{output_format}'
+        base = args.output[:-len(extension)] if args.output.lower().endswith(extension) else args.output
+        outputs = {sheet: f'{base}_{sheet}{extension}' for sheet in _SHEETS}
+        output_files = list(outputs.values())
 
-    # Check if scenario and configs exist within selection
-    if scenario_name not in collection.list_scenarios():
-        print(f'[ERROR] The specified collection does not include Scenario "{scenario_name}".')
-        sys.exit(1)
+    # Make sure the output can be written and the collection exists, before any data is retrieved
+    # A single stat call checks existence and type and is passed on to the collection
+    error, collection_stat = _check_paths(output_files, collection_path)
+    if error is not None:
+        _fail(error)
 
-    if leak_config_name not in collection.list_configs(scenario_name)['LeakConfigs']:
-        print(f'[ERROR] Scenario "{scenario_name}" does not contain Leak Config "{leak_config_name}".')
-        sys.exit(1)
+    # Heavy dependencies are only imported once the paths are checked
+    from atmn.ScenarioLoader import ScenarioCollection
+    from atmn import _fast_xlsx
 
-    if sensorconfig_name not in collection.list_configs(scenario_name)['SensorConfigs']:
-        print(f'[ERROR] Scenario "{scenario_name}" does not contain Sensor Config "{sensorconfig_name}".')
-        sys.exit(1)
-
-    if sensorfault_config_name not in collection.list_configs(scenario_name)['SensorfaultConfigs']:
-        print(f'[ERROR] Scenario "{scenario_name}" does not contain Sensorfault Config "{sensorfault_config_name}".')
-        sys.exit(1)
+    # Initialize scenario collection and check if scenario and configs exist within selection
+    collection = ScenarioCollection(collection_path, stat_result=collection_stat)
+    error = _check_configs(collection, scenario_name, leak_config_name, sensorconfig_name, sensorfault_config_name)
+    if error is not None:
+        _fail(error)
 
     # Retrieve Data
     data = collection.get(scenario_name, leak_config_name, sensorconfig_name, sensorfault_config_name)
 
-    # Write measurements to excel file
-    with pd.ExcelWriter(output) as writer:
+    if output_format == 'xlsx':
+        # Write measurements to excel file
+        # Numeric measurements are written directly as XML, which is much faster.
+        # Otherwise xlsxwriter is preferred, openpyxl serves as fallback.
+        if all(_fast_xlsx.supports(df) for df in data.values()):
+            _fast_xlsx.write_xlsx(output, data)
+        else:
+            # The streaming writers would silently drop cells beyond the excel sheet size
+            for df in data.values():
+                _fast_xlsx.check_sheet_size(df)
+            try:
+                _write_excel(data, output)
+            except ImportError:
+                _write_excel_openpyxl(data, output)
+
+        print(f'Successfully wrote {output}')
+    elif output_format == 'csvzip':
+        _write_csvzip(data, output)
+        print(f'Successfully wrote {output}')
+    else:
+        # Write one parquet or feather file per measurement type, both require pyarrow
+        try:
+            for sheet, df in data.items():
+                df = _downcast(df)
+                if output_format == 'parquet':
+                    df.to_parquet(outputs[sheet], engine='pyarrow', compression='zstd')
+                else:
+                    # Feather files do not store an index
+                    df.reset_index().to_feather(outputs[sheet])
+        except ImportError:
+            _fail(f'Writing {output_format} files requires pyarrow to be installed.')
+
         for sheet in data.keys():
-            data[sheet].to_excel(writer, sheet_name=sheet)
+            print(f'Successfully wrote {outputs[sheet]}')
+
+def _fail(message):
+    """
+    Report an error and exit with code 1.
+
+    :param message: The error message
+    """
+
+    print(f'[ERROR] {message}', file=sys.stderr)
+    raise SystemExit(1)
+
+def _check_paths(outputs, collection_path):
+    """
+    Check that the output files can be written and that the collection path is a directory.
+
+    :param outputs: List of paths to the output files
+    :param collection_path: Path to the scenario collection
+    :returns: A tuple of an error message, None if the paths are valid, and the stat result of the collection path
+    """
+
+    for output in outputs:
+        output_dir = os.path.dirname(output) or '.'
+        if not os.path.isdir(output_dir) or not os.access(output_dir, os.W_OK) \
+                or (os.path.exists(output) and not os.access(output, os.W_OK)):
+            return f'Cannot write output file "{output}".', None
+
+    try:
+        collection_stat = os.stat(collection_path)
+    except FileNotFoundError:
+        return f'No collection found at "{collection_path}".', None
+    if not stat.S_ISDIR(collection_stat.st_mode):
+        return f'The collection path "{collection_path}" is not a directory.', None
+
+    return None, collection_stat
+
+def _check_configs(collection, scenario_name, leak_config_name, sensorconfig_name, sensorfault_config_name):
+    """
+    Check that the scenario and the selected configs exist within the collection.
+
+    :param collection: The scenario collection
+    :param scenario_name: The name of the scenario
+    :param leak_config_name: The name of the leak config
+    :param sensorconfig_name: The name of the sensor config
+    :param sensorfault_config_name: The name of the sensorfault config
+    :returns: An error message, or None if everything exists
+    """
+
+    if scenario_name not in set(collection.list_scenarios()):
+        return f'The specified collection does not include Scenario "{scenario_name}".'
+
+    # Configs are listed once and checked per type
+    configs = collection.list_configs(scenario_name)
+    checks = [
+        ('LeakConfigs', leak_config_name, 'Leak Config'),
+        ('SensorConfigs', sensorconfig_name, 'Sensor Config'),
+        ('SensorfaultConfigs', sensorfault_config_name, 'Sensorfault Config')
+    ]
+    for config_type, config_name, label in checks:
+        if config_name not in configs[config_type]:
+            return f'Scenario "{scenario_name}" does not contain {label} "{config_name}".'
+
+    return None
+
+def _write_csvzip(data, output):
+    """
+    Write measurements to a zip archive, one csv file per measurement type.
+
+    :param data: A dictionary of measurement data frames
+    :param output: Path to the output zip file
+    """
+
+    import io
+    import zipfile
+    import numpy as np
+    from atmn._fast_xlsx import format_values
+
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for sheet, df in data.items():
+            with archive.open(f'{sheet}.csv', 'w') as raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as csv:
+                # Columns are converted separately to their shortest string representation,
+                # floats through float64, so the exact stored values are written like in the excel export
+                columns = [df.index.to_numpy(), *(df.iloc[:, j].to_numpy() for j in range(df.shape[1]))]
+                values = np.column_stack([format_values(column) for column in columns])
+                header = ','.join(str(name) for name in [df.index.name or '', *df.columns])
+                np.savetxt(csv, values, fmt='%s', delimiter=',', header=header, comments='')
+
+def _write_excel(data, output):
+    """
+    Write measurements to an excel file, one sheet per measurement type.
+    Rows are streamed to disk using xlsxwriter's constant memory mode.
+
+    :param data: A dictionary of measurement data frames
+    :param output: Path to the output xlsx file
+    """
+
+    import xlsxwriter
+
+    import datetime
+
+    # Sensor ids are written as plain strings, no need to check them for formulas or urls
+    # Dates are formatted like in the pandas excel export
+    date_format = 'yyyy-mm-dd hh:mm:ss'
+    options = {'constant_memory': True, 'strings_to_numbers': False, 'strings_to_formulas': False, 'strings_to_urls': False,
+               'default_date_format': date_format}
+    with xlsxwriter.Workbook(output, options) as workbook:
+        # Same look as the pandas excel export: bold header and index
+        header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        index_date_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top', 'num_format': date_format})
+
+        for sheet, df in data.items():
+            worksheet = workbook.add_worksheet(sheet)
+
+            # In constant memory mode only the current row is kept, hence
+            # cells have to be written strictly row by row.
+            worksheet.write_row(0, 0, [df.index.name, *df.columns], header_format)
+            for row, (index, *cells) in enumerate(_iter_rows(df), start=1):
+                worksheet.write(row, 0, index, index_date_format if isinstance(index, datetime.datetime) else header_format)
+                worksheet.write_row(row, 1, cells)
+
+def _write_excel_openpyxl(data, output):
+    """
+    Write measurements to an excel file, one sheet per measurement type.
+    This is the fallback if xlsxwriter is not installed, it uses openpyxl's
+    write-only mode to stream rows instead of holding all cells in memory.
+
+    :param data: A dictionary of measurement data frames
+    :param output: Path to the output xlsx file
+    """
+
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+
+    workbook = openpyxl.Workbook(write_only=True)
+    header_font = openpyxl.styles.Font(bold=True)
+
+    for sheet, df in data.items():
+        worksheet = workbook.create_sheet(sheet)
+
+        # Helper to create bold header and index cells
+        def header_cell(value):
+            cell = WriteOnlyCell(worksheet, value)
+            cell.font = header_font
+            return cell
+
+        worksheet.append([header_cell(value) for value in [df.index.name, *df.columns]])
+        for index, *cells in _iter_rows(df):
+            worksheet.append([header_cell(index), *cells])
+
+    workbook.save(output)
+
+def _downcast(df):
+    """
+    Convert float64 columns to float32, if no value changes by doing so.
+    Binary formats store the values in their dtype, so smaller dtypes save
+    bytes without losing information.
+
+    :param df: The data frame to convert
+    :returns: The converted data frame
+    """
+
+    import numpy as np
+
+    downcast = {}
+    for column in df.columns[df.dtypes == np.float64]:
+        values = df[column].to_numpy()
+        # float32 overflows to inf for large values, which the comparison catches
+        with np.errstate(over='ignore'):
+            if np.array_equal(values.astype(np.float32), values, equal_nan=True):
+                downcast[column] = np.float32
+    return df.astype(downcast) if downcast else df
+
+def _iter_rows(df):
+    """
+    Iterate over the rows of a data frame as plain python values.
+    The index is treated as a regular first column. Missing and infinite
+    values are returned as None, so they are written as empty cells like
+    in the numeric export.
+
+    :param df: The data frame to iterate over
+    :returns: A generator of row tuples, starting with the index value
+    """
+
+    import numpy as np
 
-    print(f'Successfully wrote {output}')
+    frame = df.reset_index()
+    values = frame.astype(object).where(frame.notna() & ~frame.isin([np.inf, -np.inf]), None)
+    return values.itertuples(index=False, name=None)
 
 def configure_parser(parser):
     """
@@ -66,7 +290,8 @@ def configure_parser(parser):
     parser.add_argument('leak_config_name', help='Name of the Leak Config')
     parser.add_argument('sensorconfig_name', help='Name of the Sensor Config')
     parser.add_argument('sensorfault_config_name', help='Name of the Sensorfault Config')
-    parser.add_argument('output', help='Path to the output xlsx file')
+    parser.add_argument('output', help='Path to the output file. For parquet and feather, one file per measurement type is written, suffixed with its name')
+    parser.add_argument('-f', '--format', choices=['xlsx', 'csvzip', 'parquet', 'feather'], default='xlsx', help='Output format, csvzip writes a zip archive of csv files, parquet and feather require pyarrow. Default: xlsx')
 
 def main():
     """
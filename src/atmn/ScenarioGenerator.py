@@ -3,10 +3,12 @@
 import os
 import sys
 import lxml.etree
-import multiprocessing
+import collections
+import concurrent.futures
 import wntr
 import numpy as np
 import hashlib
+import pickle
 import shutil
 import psutil
 import argparse
@@ -14,9 +16,16 @@ import alive_progress
 
 verbose = 0
 
+# Compiled config schemas, keyed by schema path and modification time
+_SCHEMA_CACHE = {}
+
+# Leak demand per leak area, as also used in wntr:
+# discharge coeff * sqrt(2/1000) * water density
+_LEAK_DEMAND_COEFFICIENT = 0.75 * np.sqrt(2 / 1000) * 990.27
+
 class ScenarioGenerator:
 
-    def __init__(self, config_file, collection_path=None, force_regenerate=False, selection=None, n_threads=1, max_mem=None, dtype=None):
+    def __init__(self, config_file, collection_path=None, force_regenerate=False, selection=None, n_threads=1, max_mem=None, dtype=None, file_format='pkl'):
         """
         Scenario Generator Constructor.
 
@@ -27,6 +36,7 @@ class ScenarioGenerator:
         :param n_threads: Number of threads to use, for single threaded use None
         :param max_mem: Maximum memory to use in parallel mode
         :param dtype: Datatype to save the measurement values with, either a numpy type or "csv"
+        :param file_format: File format for binary datatypes, either "pkl" or "parquet"
         """
 
         # Check if config file exists
@@ -38,11 +48,16 @@ class ScenarioGenerator:
         # Retrieve command line parameters
         self.base_path = os.path.dirname(self.config_path)
         self.force_regenerate = force_regenerate
-        self.selection = selection
+        self.selection = set(selection) if selection is not None else None
         self.collection_path = os.path.abspath(collection_path) if collection_path else self.base_path
         self.n_threads = n_threads
         self.max_mem = max_mem
         self.dtype = dtype
+        self.file_format = file_format
+
+        # Scenarios with any selected leak config, i.e. all prefixes of a selection ending before a "."
+        self.selected_scenarios = {sel[:i] for sel in self.selection for i, char in enumerate(sel) if char == '.'} \
+            if self.selection is not None else None
 
         # Read and validate the config file
         self.read_config()
@@ -55,17 +70,14 @@ class ScenarioGenerator:
 
         if verbose > 1: print('Starting Scenario Generator...')
 
-        # Get current memory usage as baseline, 5% safety margin
+        # Get current memory usage as baseline
+        # It is sampled again whenever jobs are started, so no safety margin is needed
         process = psutil.Process(os.getpid())
-        self.used_memory_baseline = (process.memory_info().rss * 1.05) // 1000
+        self.used_memory_baseline = process.memory_info().rss // 1000
 
         # Calculate the available memory
         self.available_memory = self.max_mem - self.used_memory_baseline
 
-        # Create sensor masks
-        # They decide which measurements get saved to disk
-        self.create_sensor_masks()
-
         # Write the actual configs and set up Simulation Jobs
         self.create_job_list_and_write_configs()
         self.n_jobs = len(self.job_list)
@@ -73,15 +85,37 @@ class ScenarioGenerator:
         # Simulate jobs
         print(f'Starting simulation for {self.n_jobs} jobs in {self.n_threads} threads...')
 
-        # Set up process communication
-        self.available_memory_shared = multiprocessing.Value('i', int(self.available_memory))
-        self.memory_condition = multiprocessing.Condition()
-
         # Spawn a pool of workers and track using progress bar
-        pool = multiprocessing.Pool(self.n_threads, Worker.init_worker, (self.available_memory_shared, self.memory_condition))
-        with alive_progress.alive_bar(self.n_jobs) as progress:
-            for _ in pool.imap_unordered(Worker.worker, self.job_list):
-                progress()
+        # Jobs are only submitted while their estimated memory fits into the available memory,
+        # otherwise they wait in the main process until running jobs have finished.
+        # If nothing is running, the next job is always submitted.
+        # Jobs are started largest first, the memory estimate scales with the network size
+        # and number of iterations and thus also serves as estimate of the simulation time
+        # Every worker holds its own copy of the pickled networks, which the job estimates do not cover
+        networks_memory = self.networks_memory * min(self.n_threads, self.n_jobs)
+        reserved_memory = 0
+        pending = collections.deque(sorted(self.job_list, key=lambda job: -job.memory_estimate))
+        running = {}
+        with concurrent.futures.ProcessPoolExecutor(self.n_threads, initializer=Worker.init_worker, initargs=(self.sensor_masks, self.networks_bytes)) as executor, \
+                alive_progress.alive_bar(self.n_jobs) as progress:
+            while pending or running:
+                # The memory used by the main process changes over time, e.g. by the job list,
+                # so it is measured again instead of relying on the baseline
+                available_memory = self.max_mem - process.memory_info().rss // 1000 - reserved_memory - networks_memory
+                while pending and len(running) < self.n_threads \
+                        and (not running or pending[0].memory_estimate <= available_memory):
+                    job = pending.popleft()
+                    available_memory -= job.memory_estimate
+                    reserved_memory += job.memory_estimate
+                    running[executor.submit(Worker.worker, job)] = job
+                    if verbose > 1: print(f'Reserved memory for {job.scenario_config["name"]}.{job.leak_config_name}. Left: {available_memory}')
+
+                # Wait for jobs to finish and release their memory
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    reserved_memory -= running.pop(future).memory_estimate
+                    future.result()
+                    progress()
 
         print(f'Done simulating {self.n_jobs} jobs.')
 
@@ -93,16 +127,17 @@ class ScenarioGenerator:
         if verbose: print('Reading Config...')
 
         # Read in config and schema
+        # Compiling the schema is expensive, so it is only done once per process
         xml_doc = lxml.etree.parse(self.config_path)
-        xml_schema_doc = lxml.etree.parse(os.path.join(os.path.dirname(__file__), 'config_schema.xsd'))
-        xml_schema = lxml.etree.XMLSchema(xml_schema_doc)
+        schema_path = os.path.join(os.path.dirname(__file__), 'config_schema.xsd')
+        schema_key = (schema_path, os.path.getmtime(schema_path))
+        xml_schema = _SCHEMA_CACHE.get(schema_key)
+        if xml_schema is None:
+            xml_schema = lxml.etree.XMLSchema(lxml.etree.parse(schema_path))
+            _SCHEMA_CACHE[schema_key] = xml_schema
 
         # Remove comments from element tree
-        comments = xml_doc.xpath('//comment()')
-        for comment in comments:
-            parent = comment.getparent()
-            if parent is not None:
-                parent.remove(comment)
+        lxml.etree.strip_elements(xml_doc, lxml.etree.Comment, with_tail=True)
 
         # Validate the config against the schema
         try:
@@ -112,35 +147,47 @@ class ScenarioGenerator:
             print('[CRITICAL] Error parsing config:', e)
             sys.exit(1)
 
-    def create_sensor_masks(self):
+    def create_sensor_mask(self, sensor_configs):
         """
-        Create masks for each scenario and sensor type.
+        Create the mask of a scenario for each sensor type.
         These masks are used after simulation to determine, 
         which data is saved and which is not.
+
+        :param sensor_configs: The sensor configs of the scenario, e.g. its SensorConfigs collection
+        :returns: A dictionary of sensor types, containing sorted lists of sensor ids
+        """
+
+        # Initialize the empty sensor mask
+        sensor_mask = {
+            'pressure': set(),
+            'flow': set(),
+            'demand': set()
+        }
+
+        # Within the collection, add all sensors from all sensor configs
+        for sensor_config in sensor_configs:
+            for sensor_collection in sensor_config:
+                # Fill up the entry with the sensors from the corresponding type
+                sensor_type = sensor_collection.tag[:-7].lower()
+                for sensor in sensor_collection:
+                    sensor_mask[sensor_type].add(sensor.attrib['id'])
+
+        # Sort the sensors once, so that the saved columns have a deterministic order
+        return {sensor_type: sorted(sensors) for sensor_type, sensors in sensor_mask.items()}
+
+    def create_sensor_masks(self):
+        """
+        Create masks for each scenario and sensor type.
+        The generator builds the masks of the selected scenarios itself while writing
+        their configs, this builds them for all scenarios of the config at once.
+        The masks are stored in sensor_masks by scenario name, see create_sensor_mask.
         """
 
         if verbose: print('Creating sensor masks...')
 
-        # Initialize the empty sensor mask dict
         self.sensor_masks = {}
         for scenario in self.scenarios:
-            # For each scenario, create an entry
-            scenario_name = scenario.attrib['name']
-            self.sensor_masks[scenario_name] = {
-                'pressure': set(),
-                'flow': set(),
-                'demand': set()
-            }
-            # Read the Sensor config collection
-            for config_collection in scenario:
-                if config_collection.tag == 'SensorConfigs':
-                    for sensor_config in config_collection:
-                        # Within each collection, add all sensors from all sensor configs
-                        for sensor_collection in sensor_config:
-                            # Fill up the entry with the sensors from the corresponding type
-                            sensor_type = sensor_collection.tag[:-7].lower()
-                            for sensor in sensor_collection:
-                                self.sensor_masks[scenario_name][sensor_type].add(sensor.attrib['id'])
+            self.sensor_masks[scenario.attrib['name']] = self.create_sensor_mask(scenario.iterfind('SensorConfigs/SensorConfig'))
 
     def create_job_list_and_write_configs(self):
         """
@@ -150,22 +197,43 @@ class ScenarioGenerator:
 
         if verbose: print('Adding simulation jobs...')
 
-        # Initialize job list
+        # Initialize job list and sensor masks
+        # The masks decide which measurements get saved to disk
         self.job_list = []
+        self.sensor_masks = {}
 
         # Keep track of lowest estimated memory size
         # We assume it is smaller than 1 PB :)
         lowest_estimated_memory = 10**12
 
+        # Make network paths absolute
+        for scenario in self.scenarios:
+            network_path = scenario.attrib['network']
+            scenario.attrib['network'] = network_path if os.path.isabs(network_path) \
+                else os.path.join(self.base_path, network_path)
+
+        # Water networks and their pickled form, shared by all scenarios using the same network file
+        # The pickled networks are handed to the worker processes once, not with every job
+        networks = {}
+        self.networks_bytes = {}
+
+        # Parsing water networks is expensive. In parallel mode, the distinct networks
+        # of all selected scenarios are read in worker processes up front.
+        network_paths = sorted({scenario.attrib['network'] for scenario in self.scenarios if self.is_selected(scenario.attrib['name'])})
+        if self.n_threads > 1 and len(network_paths) > 1:
+            if verbose > 1: print(f'Reading {len(network_paths)} networks in parallel')
+            with concurrent.futures.ProcessPoolExecutor(min(self.n_threads, len(network_paths))) as executor:
+                self.networks_bytes = dict(zip(network_paths, executor.map(Worker.read_network, network_paths)))
+
         # Iterate through all scenarios
         for scenario in self.scenarios:
             scenario_name = scenario.attrib['name']
             network_path = scenario.attrib['network']
-            network_path = network_path if os.path.isabs(network_path) \
-                else os.path.join(self.base_path, network_path)
-            scenario.attrib['network'] = network_path
             scenario_path = os.path.join(self.collection_path, scenario_name)
 
+            # Convert scenario_config to dict, it is shared by all jobs of this scenario
+            scenario_dict = dict(scenario.attrib)
+
             # If whole scenario is force regenerated, remove it's whole folder structure
             if self.force_regenerate and self.is_selected(scenario_name, '*'):
                 shutil.rmtree(scenario_path, ignore_errors=True)
@@ -174,18 +242,22 @@ class ScenarioGenerator:
             if not self.is_selected(scenario_name):
                 continue
 
-            # Initialize water network once to
+            # Initialize water network once per network file to
             # * Validate
             # * Save topography
             # * Estimate memory consumption
+            # * Pass it on to the simulation jobs, which then do not need to parse it again
             if verbose > 1: print(f'Validating {network_path}')
-            wn = wntr.network.WaterNetworkModel(network_path)
+            wn = networks.get(network_path)
+            if wn is None:
+                wn = pickle.loads(self.networks_bytes[network_path]) if network_path in self.networks_bytes \
+                    else wntr.network.WaterNetworkModel(network_path)
+                networks[network_path] = wn
             self.validate_wn(wn, network_path)
             self.write_topology(wn, scenario_path)
             estimated_memory = self.estimate_wn_memory(wn, scenario.attrib)
             lowest_estimated_memory = estimated_memory if estimated_memory < lowest_estimated_memory else lowest_estimated_memory
             if verbose > 1: print(f'Estimated memory: {estimated_memory}kB')
-            wn = None
 
             # Skip this scenario, if its memory requirements would exceed the available memory
             if estimated_memory > self.available_memory:
@@ -195,10 +267,19 @@ class ScenarioGenerator:
             ## Iterate through all configs within this scenario
             for config_collection in scenario:
                 if config_collection.tag == 'SensorConfigs':
+                    # Sensor configs always precede the leak configs
                     self.write_config_collection(config_collection, os.path.join(scenario_path, 'sensors'))
+                    self.sensor_masks[scenario_name] = self.create_sensor_mask(config_collection)
                 elif config_collection.tag == 'SensorfaultConfigs':
                     self.write_config_collection(config_collection, os.path.join(scenario_path, 'sensorfaults'))
-                elif config_collection.tag == 'LeakConfigs':                    
+                elif config_collection.tag == 'LeakConfigs':
+                    # List existing measurements once, instead of checking each leak config
+                    try:
+                        with os.scandir(os.path.join(scenario_path, 'measurements')) as entries:
+                            existing_measurements = {entry.name for entry in entries}
+                    except FileNotFoundError:
+                        existing_measurements = set()
+
                     for leak_config in config_collection:
 
                         leak_config_name = leak_config.attrib['name']
@@ -208,6 +289,7 @@ class ScenarioGenerator:
                         # If leak config is force regenerated, remove its folder structure
                         if self.force_regenerate and self.is_selected(scenario_name, leak_config_name):
                             shutil.rmtree(measurements_path, ignore_errors=True)
+                            existing_measurements.discard(leak_config_name)
 
                         # If this leak config is not selected, continue with next one
                         if not self.is_selected(scenario_name, leak_config_name):
@@ -215,26 +297,33 @@ class ScenarioGenerator:
                         
                         # If measurements already exist, skip this simulation
                         # When forcing, this folder just got removed
-                        if os.path.exists(measurements_path): 
+                        if leak_config_name in existing_measurements:
                             continue
                         
                         # Convert leak config to list of leak dictionaries
                         leaks = []
                         for leak in leak_config:
-                            leaks.append({key: leak.attrib[key] for key in leak.attrib.iterkeys()})
+                            leaks.append(dict(leak.attrib))
 
                         # Write config
                         self.write_config(leak_config, leak_config_path)
 
-                        # Convert scenario_config to dict
-                        scenario_dict = {key: scenario.attrib[key] for key in scenario.attrib.iterkeys()}
+                        # Serialize the water network once for all jobs using it
+                        if network_path not in self.networks_bytes:
+                            self.networks_bytes[network_path] = pickle.dumps(wn)
 
                         # Append simulation job to job list
+                        # Sensor mask and water network are looked up by the worker processes
                         if verbose: print(f'Adding: {scenario_name}.{leak_config_name}')
-                        self.job_list.append(SimulationJob(scenario_dict, leaks, leak_config_name, self.sensor_masks[scenario_name], measurements_path, estimated_memory, self.dtype))
+                        self.job_list.append(SimulationJob(scenario_dict, leaks, leak_config_name, None, measurements_path, estimated_memory, self.dtype, file_format=self.file_format))
         
-        # Clamp number of threads according to memory constraints
-        practical_n_threads = int(self.available_memory // lowest_estimated_memory)
+        # Only the networks of the jobs are shipped to the worker processes, each worker holds all of them
+        job_networks = {job.scenario_config['network'] for job in self.job_list}
+        self.networks_bytes = {network_path: wn_bytes for network_path, wn_bytes in self.networks_bytes.items() if network_path in job_networks}
+        self.networks_memory = sum(map(len, self.networks_bytes.values())) // 1000
+
+        # Clamp number of threads according to memory constraints, a single job is always run
+        practical_n_threads = max(1, int(self.available_memory // (lowest_estimated_memory + self.networks_memory)))
         if practical_n_threads < self.n_threads:
             self.n_threads = practical_n_threads
             print(f'Clamping threads to {self.n_threads} due to memory constraints...')
@@ -285,8 +374,7 @@ class ScenarioGenerator:
         """
 
         # Make sure the folder structure exists
-        if not os.path.exists(path):
-            os.makedirs(path)
+        os.makedirs(path, exist_ok=True)
 
         # Create XML Tree
         xml_root = lxml.etree.Element("Network")
@@ -319,8 +407,7 @@ class ScenarioGenerator:
         config_path = os.path.join(path, f'{config_name}.xml')
 
         # Make sure the folder structure exists
-        if not os.path.exists(path):
-            os.makedirs(path)
+        os.makedirs(path, exist_ok=True)
         
         # Write new config
         xml = lxml.etree.ElementTree(config)
@@ -349,22 +436,29 @@ class ScenarioGenerator:
 
         if verbose > 1: print(f'Writing config: {file_path}')
 
-        # Get hash of existing file
+        # Serialize the new file once, it is only written if it is new or has changed
+        new_file = lxml.etree.tostring(xml, xml_declaration=True)
+
+        # Get hash of existing file, reading it in chunks
         old_file_hash = None
         if os.path.exists(file_path):
-            with open(file_path) as f:
-                old_file_hash = hashlib.md5(f.read().encode('utf-8')).digest()
+            old_file_hash = hashlib.blake2b(digest_size=16)
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 16), b''):
+                    old_file_hash.update(chunk)
+            old_file_hash = old_file_hash.digest()
+
+        # Check for equivalence with previous file
+        if old_file_hash is not None and hashlib.blake2b(new_file, digest_size=16).digest() == old_file_hash:
+            return
 
         # Write new file
-        xml.write(file_path, xml_declaration=True)
+        with open(file_path, 'wb') as f:
+            f.write(new_file)
 
-        # Check for equivalence with previous file
+        # If the file existed with different contents, print a warning
         if old_file_hash is not None:
-            with open(file_path) as f:
-                new_file_hash = hashlib.md5(f.read().encode('utf-8')).digest()
-            # If hashes differ, print a warning
-            if new_file_hash != old_file_hash:
-                print(f'[WARNING] File {file_path} has changed. The corresponding scenario has not been regenerated in its entirety. This might mean that this file now is inconsistent with previously simulated leak configs.')
+            print(f'[WARNING] File {file_path} has changed. The corresponding scenario has not been regenerated in its entirety. This might mean that this file now is inconsistent with previously simulated leak configs.')
 
     def is_selected(self, scenario_name, leak_config_name=None):
         """
@@ -384,7 +478,7 @@ class ScenarioGenerator:
 
         # Check if any leak config is selected if only scenario name is given
         if leak_config_name is None:
-            return any([sel.startswith(f'{scenario_name}.') for sel in self.selection])
+            return scenario_name in self.selected_scenarios
 
         # Check if specific config is selected
         if f'{scenario_name}.{leak_config_name}' in self.selection \
@@ -397,17 +491,19 @@ class ScenarioGenerator:
 
 class SimulationJob:
 
-    def __init__(self, scenario_config, leaks, leak_config_name, sensor_mask, results_path, memory_estimate, dtype):
+    def __init__(self, scenario_config, leaks, leak_config_name, sensor_mask, results_path, memory_estimate, dtype, wn_bytes=None, file_format='pkl'):
         """
         Simulation Job constructor.
 
         :param scenario_config: A dictionary containing the scenario config
         :param leaks: A list of dictionaries describing the leaks
         :param leak_config_name: The name of the leak config
-        :param sensor_mask: A mask to determine, which sensors to save an which not
+        :param sensor_mask: A mask to determine, which sensors to save an which not, if None it is set by the worker
         :param results_path: Path where to save the simulation results
         :param memory_estimate: Estimation of this jobs maximum memory requirements
         :param dtype: Datatype to save the measurement values with, either a numpy type or "csv"
+        :param wn_bytes: The pickled water network of the scenario, if None it is read from the network file
+        :param file_format: File format for binary datatypes, either "pkl" or "parquet"
         """
 
         # Save attributes
@@ -418,6 +514,8 @@ class SimulationJob:
         self.results_path = results_path
         self.memory_estimate = memory_estimate
         self.dtype = dtype
+        self.wn_bytes = wn_bytes
+        self.file_format = file_format
 
     def init(self):
         '''
@@ -434,7 +532,10 @@ class SimulationJob:
 
         # Initialize water network
         if verbose > 1: print(f'Initializing {self.scenario_config["name"]}.{self.leak_config_name}', flush=True)
-        self.wn = wntr.network.WaterNetworkModel(network_path)
+        if self.wn_bytes is not None:
+            self.wn = pickle.loads(self.wn_bytes)
+        else:
+            self.wn = wntr.network.WaterNetworkModel(network_path)
         self.wn.options.hydraulic.demand_model = 'PDD'
         self.wn.options.time.duration = self.iterations * self.time_step
 
@@ -509,30 +610,31 @@ class SimulationJob:
             # Pressure at which the leak starts loosing water
             leak_node.minimum_pressure = 0
 
-            # Ramp-up
-            # When computing the radii, we go from step to diameter/2 + step * 0.5
-            # The final step is multiplied by 0.5 for numerical stability (otherwise one too many samples may be generated)
-            if i_peak == i_start:
-                leak_ramp_up = np.array([])
-            else:
-                leak_radius_step = diameter / (i_peak - i_start) / 2
-                leak_radii = np.arange(leak_radius_step, diameter/2 + leak_radius_step * 0.5 , leak_radius_step)
-                leak_ramp_up = 0.75 * np.sqrt(2 / 1000) * 990.27 * np.pi * leak_radii ** 2
-
             # Constant demand
             leak_area = np.pi * (diameter / 2) ** 2
-            leak_demand_constant = 0.75 * np.sqrt(2 / 1000) * 990.27 * leak_area
+            leak_demand_constant = _LEAK_DEMAND_COEFFICIENT * leak_area
 
             # Create array of demands
             pattern = np.zeros(self.iterations)
-            pattern[i_start:i_peak] = leak_ramp_up
+
+            # Ramp-up
+            # The radii grow linearly from step to diameter/2, i.e. the k-th radius is k * step.
+            # The demands are computed in place within the pattern.
+            if i_peak > i_start:
+                leak_radius_step = diameter / (i_peak - i_start) / 2
+                leak_ramp_up = pattern[i_start:i_peak]
+                np.square(np.arange(1, leak_ramp_up.shape[0] + 1, dtype=np.float64), out=leak_ramp_up)
+                leak_ramp_up *= _LEAK_DEMAND_COEFFICIENT * np.pi * leak_radius_step ** 2
+
             pattern[i_peak:i_end] = leak_demand_constant
 
             # Resample if pattern timestep mismatches simulation time step
-            if self.wn.options.time.pattern_timestep != self.time_step:
-                scaling_factor = self.wn.options.time.pattern_timestep / self.time_step
-                stretched_max = self.iterations * self.wn.options.time.pattern_timestep
-                pattern = np.interp(np.arange(0, stretched_max, scaling_factor), np.arange(0, pattern.shape[0]), pattern)
+            # Only the pattern steps within the simulation duration are sampled
+            pattern_timestep = self.wn.options.time.pattern_timestep
+            if pattern_timestep != self.time_step:
+                scaling_factor = pattern_timestep / self.time_step
+                n_samples = self.iterations * self.time_step // pattern_timestep + 1
+                pattern = np.interp(np.arange(n_samples) * scaling_factor, np.arange(pattern.shape[0]), pattern)
 
             # Create unique pattern name
             pattern_name = f'leak_pattern_{leak_node_name}'
@@ -574,22 +676,25 @@ class SimulationJob:
 
         if verbose > 1: print(f'Saving results for {self.scenario_config["name"]}.{self.leak_config_name}', flush=True)
         # Extract relevant results and apply save mask
-        pressure = self.results.node['pressure'].loc[:,list(self.sensor_mask['pressure'])]
+        pressure = self.results.node['pressure'].loc[:,self.sensor_mask['pressure']]
         pressure.index.name = 'time'
-        demand = self.results.node['demand'].loc[:,list(self.sensor_mask['demand'])]
+        demand = self.results.node['demand'].loc[:,self.sensor_mask['demand']]
         demand.index.name = 'time'
-        flow = self.results.link['flowrate'].loc[:,list(self.sensor_mask['flow'])]
+        flow = self.results.link['flowrate'].loc[:,self.sensor_mask['flow']]
         flow.index.name = 'time'
 
         # Create folder structure
-        if not os.path.exists(self.results_path):
-            os.makedirs(self.results_path)
+        os.makedirs(self.results_path, exist_ok=True)
 
         # Save dataframes
         if self.dtype == 'csv':
             pressure.to_csv(os.path.join(self.results_path, 'pressure.csv'))
             flow.to_csv(os.path.join(self.results_path, 'flow.csv'))
             demand.to_csv(os.path.join(self.results_path, 'demand.csv'))
+        elif self.file_format == 'parquet':
+            pressure.astype(self.dtype).to_parquet(os.path.join(self.results_path, 'pressure.parquet'), engine='pyarrow', compression='zstd')
+            flow.astype(self.dtype).to_parquet(os.path.join(self.results_path, 'flow.parquet'), engine='pyarrow', compression='zstd')
+            demand.astype(self.dtype).to_parquet(os.path.join(self.results_path, 'demand.parquet'), engine='pyarrow', compression='zstd')
         else:
             pressure.astype(self.dtype).to_pickle(os.path.join(self.results_path, 'pressure.pkl'))
             flow.astype(self.dtype).to_pickle(os.path.join(self.results_path, 'flow.pkl'))
@@ -607,68 +712,43 @@ class Worker:
 
         assert False, 'Worker only contains static methods, do not initialize.'
 
-    def _reserve_memory(available_memory, memory):
-        """
-        Higher order function to be used as a predicate. It tries to reserve 
-        memory from the multiprocessing.Value "available_memory", returns True
-        if successful, otherwise false.
-
-        :param available_memory: multiprocessing.Value that contains the available memory
-        :param memory: Memory to reserve
-        """
-
-        # Define predicate
-        def __reserve_memory():
-            reserved = False
-            with available_memory.get_lock():
-                new_available_memory = available_memory.value - int(memory)
-                if new_available_memory >= 0:
-                    available_memory.value = new_available_memory
-                    reserved = True
-                    if verbose > 1: print(f'Some process reserved memory. Left: {available_memory.value}')
-
-            return reserved
-
-        # Return predicate
-        return __reserve_memory
-
-    def _unreserve_memory(available_memory, memory):
+    def read_network(network_path):
         """
-        Unreserve memory, by adding "memory" to the shared variable "available_memory"
+        Read a water network file in a worker process.
 
-        :param available_memory: multiprocessing.Value memory to unreserve from
-        :param memory: amount of memory to unreserve
+        :param network_path: Path to the water network file
+        :returns: The pickled water network
         """
 
-        with available_memory.get_lock():
-            available_memory.value += int(memory)
-            if verbose > 1: print(f'Some process unreserved memory. Left: {available_memory.value}')
+        return pickle.dumps(wntr.network.WaterNetworkModel(network_path))
 
-    def init_worker(available_memory_param, condition_param):
+    def init_worker(sensor_masks_param, networks_bytes_param):
         """
-        Initialize the worker process by making shared variables available
+        Initialize the worker process by making the state shared by all jobs available
 
-        :param available_memory_param: multiprocessing.Value memory available for simulation jobs
-        :param condition_param: wait condition for sufficient memory
+        :param sensor_masks_param: Dictionary of sensor masks by scenario name
+        :param networks_bytes_param: Dictionary of pickled water networks by network path
         """
 
-        global available_memory
-        global condition
+        global sensor_masks
+        global networks_bytes
 
-        available_memory = available_memory_param
-        condition = condition_param
+        sensor_masks = sensor_masks_param
+        networks_bytes = networks_bytes_param
 
     def worker(job):
         """
         Worker to process a single SimulationJob
 
-        :param job: multiprocessing.Queue containing the jobs
+        :param job: The SimulationJob to process
         """
 
-        # Reserve memory for this job
-        with condition:
-            condition.wait_for(Worker._reserve_memory(available_memory, job.memory_estimate))
-                
+        # Complete the job with the state shared by all jobs
+        if job.sensor_mask is None:
+            job.sensor_mask = sensor_masks[job.scenario_config['name']]
+        if job.wn_bytes is None:
+            job.wn_bytes = networks_bytes.get(job.scenario_config['network'])
+
         # Initialize and simulate the jobs and save the results
         if not job.init():
             print(f'[ERROR] Could not initialize Scenario {job.scenario_config["name"]}.{job.leak_config_name}; Skipping...', flush=True)
@@ -676,11 +756,6 @@ class Worker:
             return
         job.simulate()
         job.save()
-                
-        # After processing, unreserve memory and notify the other threads
-        Worker._unreserve_memory(available_memory, job.memory_estimate)
-        with condition:
-            condition.notify_all()
 
 
 def run(args):
@@ -697,6 +772,7 @@ def run(args):
     force = args.force_regenerate
     selection = args.selection
     dtype = args.dtype
+    file_format = args.format
 
     # If thread number is given, us it. Otherwise use 1 if not parallel and os.cpu_count() if parallel
     n_threads = args.threads if args.threads is not None \
@@ -712,8 +788,20 @@ def run(args):
     elif dtype != 'csv':
         dtype = f'float{dtype}'
 
+    # Parquet files are written using pyarrow, make sure it is available before simulating
+    # Half precision columns can only be written to parquet since pyarrow 15
+    if file_format == 'parquet' and dtype != 'csv':
+        try:
+            import pyarrow
+        except ImportError:
+            print('[CRITICAL] Saving measurements as parquet requires pyarrow to be installed.')
+            sys.exit(1)
+        if dtype == 'float16' and int(pyarrow.__version__.split('.')[0]) < 15:
+            print(f'[CRITICAL] Saving float16 measurements as parquet requires pyarrow 15 or newer, found {pyarrow.__version__}. Use a different dtype or update pyarrow.')
+            sys.exit(1)
+
     # Create Generator and run generations
-    generator = ScenarioGenerator(config, collection_path=collection_path, force_regenerate=force, selection=selection, n_threads=n_threads, max_mem=memory, dtype=dtype)
+    generator = ScenarioGenerator(config, collection_path=collection_path, force_regenerate=force, selection=selection, n_threads=n_threads, max_mem=memory, dtype=dtype, file_format=file_format)
     generator.run()
 
 def configure_parser(parser):
@@ -733,6 +821,7 @@ def configure_parser(parser):
     parser.add_argument('-m', '--max-memory', action='store', type=int, help='Maximum memory this generator should consume in MB')
     parser.add_argument('-v', '--verbose', action='count', default=0, help='Enable verbose output, -vv for extra verbose')
     parser.add_argument('-d', '--dtype', action='store', type=str, default='16', help='Choose datatype to store measurements as. Either 16, 32 or 64 for the corresponding floating point precision or "csv" to save in csv format. Default: 16')
+    parser.add_argument('-F', '--format', action='store', choices=['pkl', 'parquet'], default='pkl', help='Choose file format for binary datatypes, parquet requires pyarrow. Ignored for csv. Default: pkl')
 
 def main():
     """
@@ -1,27 +1,49 @@
 import os
+import io
 import hashlib
 import errno
+import functools
+import concurrent.futures
 import lxml.etree
 import pandas as pd
 import numpy as np
 
 class ScenarioCollection:
 
-    def __init__(self, path):
+    def __init__(self, path, stat_result=None):
         """
         Scenario Collection Constructor.
 
         :param path: Path to the scenario collection
+        :param stat_result: Result of os.stat for the path, if already known. Skips the existence check.
         """
         self.path = os.path.abspath(path)
-        if not os.path.exists(self.path):
+        if stat_result is None and not os.path.exists(self.path):
             raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), self.path)
 
+        # Scenarios are listed once and cached for the lifetime of this collection
+        # object, as are their configs, use refresh() to pick up changes on disk
+        self._scenarios = None
+
+        # Reading measurements is expensive, optionally keep the most recently retrieved ones.
+        # The number of cached selections can be set with the ATMN_GET_CACHE environment variable,
+        # caching is disabled by default, as every cached selection keeps its data frames in memory.
+        self._get_cache_size = _cache_size('ATMN_GET_CACHE')
+        self._get_cached = functools.lru_cache(maxsize=self._get_cache_size)(self._get)
+
+    def refresh(self):
+        """
+        Clear all cached information about the collection, so that scenarios,
+        configs and measurements are read from disk again.
+        """
+        self._scenarios = None
+        self._get_cached.cache_clear()
+
     def list_scenarios(self):
         """
         List the scenarios present in the collection.
         """
-        return list(filter(lambda scenario: os.path.isdir(os.path.join(self.path, scenario)), os.listdir(self.path)))
+        return list(self._get_scenarios())
 
     def get_scenario(self, scenario_name):
         """
@@ -30,11 +52,28 @@ class ScenarioCollection:
         :param scenario_name: The name of the scenario
         :returns: A Scenario object, or None if the Scenario does not exist within the collection
         """
-        if scenario_name in self.list_scenarios():
-            return Scenario(os.path.join(self.path, scenario_name))
-        else:
+        scenarios = self._get_scenarios()
+        if scenario_name not in scenarios:
             return None
 
+        # Scenario objects are created on first access and reused afterwards
+        scenario = scenarios[scenario_name]
+        if scenario is None:
+            scenario = Scenario(os.path.join(self.path, scenario_name))
+            scenarios[scenario_name] = scenario
+        return scenario
+
+    def _get_scenarios(self):
+        """
+        Scan the collection for scenarios, only once until the collection is refreshed.
+
+        :returns: A dictionary of scenario names, containing the Scenario object or None if not created yet
+        """
+        if self._scenarios is None:
+            with os.scandir(self.path) as entries:
+                self._scenarios = {entry.name: None for entry in entries if entry.is_dir()}
+        return self._scenarios
+
     def list_configs(self, scenario_name):
         """
         List configs for the given scenario.
@@ -42,10 +81,8 @@ class ScenarioCollection:
         :param scenario_name: The name of the scenario
         :returns: A dictionary of config types, containing lists of the available configs
         """
-        if scenario_name in self.list_scenarios():
-            return Scenario(os.path.join(self.path, scenario_name)).list_configs()
-        else:
-            return None
+        scenario = self.get_scenario(scenario_name)
+        return scenario.list_configs() if scenario is not None else None
 
     def get_leak_data(self, scenario_name, leak_config_name):
         """
@@ -55,10 +92,8 @@ class ScenarioCollection:
         :param leak_config: The name of the leak config
         :returns: A list of dictionaries containing the leak information, None if no information was found
         """
-        if scenario_name in self.list_scenarios():
-            return Scenario(os.path.join(self.path, scenario_name)).get_leak_data(leak_config_name)
-        else:
-            return None
+        scenario = self.get_scenario(scenario_name)
+        return scenario.get_leak_data(leak_config_name) if scenario is not None else None
 
     def get_sensorfault_data(self, scenario_name, sensorfault_config_name):
         """
@@ -68,14 +103,14 @@ class ScenarioCollection:
         :param sensorfault_config_name: The name of the sensorfault config
         :returns: A list of dictionaries containing the sensorfault information, None if no information was found
         """
-        if scenario_name in self.list_scenarios():
-            return Scenario(os.path.join(self.path, scenario_name)).get_sensorfault_data(sensorfault_config_name)
-        else:
-            return None
+        scenario = self.get_scenario(scenario_name)
+        return scenario.get_sensorfault_data(sensorfault_config_name) if scenario is not None else None
         
     def get(self, scenario_name, leak_config, sensor_config, sensorfault_config):
         """
         Retrieve specific measurements from the collection
+        If the ATMN_GET_CACHE environment variable is set to a number of selections, recently retrieved
+        measurements are kept in memory and a copy of the cached data frames is returned.
 
         :param scenario_name: The name of the scenario
         :param leak_config: The name of the leak config
@@ -83,10 +118,62 @@ class ScenarioCollection:
         :param sensorfault_config: The name of the sensorfault config
         :returns: A dictionary of measurement data frames, or None if the measurements do not exist within the collection
         """
-        if scenario_name in self.list_scenarios():
-            return Scenario(os.path.join(self.path, scenario_name)).get(leak_config, sensor_config, sensorfault_config)
-        else:
+        # Without cache, the data frames are not shared and need no copy
+        if self._get_cache_size == 0:
+            return self._get(scenario_name, leak_config, sensor_config, sensorfault_config)
+
+        data = self._get_cached(scenario_name, leak_config, sensor_config, sensorfault_config)
+        if data is None:
             return None
+        return {measurement: df.copy() for measurement, df in data.items()}
+
+    def batch_get(self, scenario_name, combinations, n_threads=None):
+        """
+        Retrieve the measurements of many config combinations of a scenario using a pool of threads.
+        The measurements of each leak config are read once and shared by all of its combinations,
+        for parquet measurements only the sensors used by any of these combinations are read.
+
+        :param scenario_name: The name of the scenario
+        :param combinations: An iterable of (leak_config, sensor_config, sensorfault_config) tuples
+        :param n_threads: The number of threads to use, defaults to the ThreadPoolExecutor default
+        :returns: A dictionary of the combinations, containing what get() returns for each of them
+        """
+        combinations = [tuple(combination) for combination in combinations]
+        scenario = self.get_scenario(scenario_name)
+        if scenario is None:
+            return {combination: None for combination in combinations}
+
+        # Parse the configs of all combinations up front, each config file is only parsed once.
+        # Combinations with missing configs have no measurements.
+        parsed_configs = {combination: scenario._parse_configs(*combination) for combination in combinations}
+        results = {combination: None for combination, parsed in parsed_configs.items() if parsed is None}
+
+        # Group the remaining combinations by leak config
+        groups = {}
+        for combination, parsed in parsed_configs.items():
+            if parsed is not None:
+                groups.setdefault(combination[0], []).append(combination)
+
+        with concurrent.futures.ThreadPoolExecutor(n_threads) as executor:
+            for leak_config, group in groups.items():
+                # Read the measurements of the leak config once, covering the sensors of all combinations,
+                # the combinations only select their sensors and apply sensorfaults in parallel
+                masks = [parsed_configs[combination][1] for combination in group]
+                mask = {sensor_type: list(dict.fromkeys(sensor_id for group_mask in masks for sensor_id in group_mask[sensor_type]))
+                        for sensor_type in masks[0]}
+                measurements = scenario._get_measurements(leak_config, mask)
+                group_results = executor.map(lambda combination: scenario._get_with_parsed(*parsed_configs[combination], measurements), group)
+                results.update(zip(group, group_results))
+
+        # Return the results in the order of the given combinations
+        return {combination: results[combination] for combination in combinations}
+
+    def _get(self, scenario_name, leak_config, sensor_config, sensorfault_config):
+        """
+        Read specific measurements from the collection, bypassing the cache.
+        """
+        scenario = self.get_scenario(scenario_name)
+        return scenario.get(leak_config, sensor_config, sensorfault_config) if scenario is not None else None
 
 class Scenario:
     
@@ -100,17 +187,52 @@ class Scenario:
         if not os.path.exists(self.path):
             raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), self.path)
 
+        # Configs, sensor and sensorfault configs are read on first use and cached for the
+        # lifetime of this scenario object, use refresh() to pick up changes on disk
+        self._configs = None
+        self._config_sets = None
+        self._sensor_configs = {}
+        self._sensorfault_configs = {}
+
+        # The measurements only depend on the leak config, optionally keep the most recently read ones, so that
+        # different sensor and sensorfault configs can be applied to them without reading them again.
+        # The number of cached leak configs can be set with the ATMN_MEASUREMENT_CACHE environment variable,
+        # caching is disabled by default, as every cached leak config keeps the measurements of all sensors in memory.
+        self._read_measurements_cached = functools.lru_cache(maxsize=_cache_size('ATMN_MEASUREMENT_CACHE'))(self._read_measurements)
+
+    def refresh(self):
+        """
+        Clear all cached information about the scenario, so that configs and measurements are read from disk again.
+        """
+        self._configs = None
+        self._config_sets = None
+        self._sensor_configs = {}
+        self._sensorfault_configs = {}
+        self._read_measurements_cached.cache_clear()
+
     def list_configs(self):
         """
         List configs of this scenario.
 
         :returns: A dictionary of config types, containing lists of the available configs
         """
-        return {
-            'LeakConfigs': os.listdir(os.path.join(self.path, 'measurements')),
-            'SensorConfigs': list(map(lambda x: x[:-4], os.listdir(os.path.join(self.path, 'sensors')))),
-            'SensorfaultConfigs': list(map(lambda x: x[:-4], os.listdir(os.path.join(self.path, 'sensorfaults'))))
-        }
+        self._scan_configs()
+
+        # Return copies, so the cached lists cannot be modified
+        return {config_type: list(config_names) for config_type, config_names in self._configs.items()}
+
+    def _scan_configs(self):
+        """
+        Scan the scenario for configs, only once until the scenario is refreshed.
+        """
+        if self._configs is None:
+            self._configs = {
+                'LeakConfigs': _list_entries(os.path.join(self.path, 'measurements')),
+                'SensorConfigs': _list_entries(os.path.join(self.path, 'sensors'), suffix='.xml'),
+                'SensorfaultConfigs': _list_entries(os.path.join(self.path, 'sensorfaults'), suffix='.xml')
+            }
+            # Sets for constant time lookups in get()
+            self._config_sets = {config_type: set(config_names) for config_type, config_names in self._configs.items()}
 
     def get_leak_data(self, leak_config_name):
         """
@@ -128,12 +250,7 @@ class Scenario:
             return None
 
         # Read leak config and convert to list of dicts
-        leak_config = lxml.etree.parse(leak_config_path).getroot()
-        leaks = []
-        for leak in leak_config:
-            leaks.append({key: leak.attrib[key] for key in leak.attrib.iterkeys()})
-
-        return leaks
+        return list(_iter_attributes(leak_config_path, 'Leak'))
 
     def get_sensorfault_data(self, sensorfault_config_name):
         """
@@ -151,121 +268,318 @@ class Scenario:
             return None
 
         # Read sensorfault config and convert to list of dicts
-        sensorfault_config = lxml.etree.parse(sensorfault_config_path).getroot()
-        sensorfaults = []
-        for sensorfault in sensorfault_config:
-            sensorfaults.append({key: sensorfault.attrib[key] for key in sensorfault.attrib.iterkeys()})
-
-        return sensorfaults
+        return list(_iter_attributes(sensorfault_config_path, 'Sensorfault'))
 
     def get(self, leak_config, sensor_config_name, sensorfault_config_name):
         """
         Retrieve specific measurements from this scenario.
+        If the ATMN_MEASUREMENT_CACHE environment variable is set to a number of leak configs, the measurements
+        of recently used leak configs are kept in memory, so that other sensor configs can be applied without reading them again.
 
         :param leak_config: The name of the leak config
         :param sensor_config: The name of the sensor config
         :param sensorfault_config: The name of the sensorfault config
         :returns: A dictionary of measurement data frames, or None if the measurements do not exist within the collection
         """
+        parsed_configs = self._parse_configs(leak_config, sensor_config_name, sensorfault_config_name)
+        if parsed_configs is None:
+            return None
+        return self._get_with_parsed(*parsed_configs)
+
+    def _parse_configs(self, leak_config, sensor_config_name, sensorfault_config_name):
+        """
+        Parse the sensor and sensorfault configs needed to retrieve specific measurements.
+
+        :param leak_config: The name of the leak config
+        :param sensor_config_name: The name of the sensor config
+        :param sensorfault_config_name: The name of the sensorfault config
+        :returns: A tuple of the arguments for _get_with_parsed, or None if any of the configs does not exist
+        """
 
         # Check if all necessary configs are present
-        configs = self.list_configs()
+        self._scan_configs()
+        configs = self._config_sets
         if leak_config not in configs['LeakConfigs'] \
                 or sensor_config_name not in configs['SensorConfigs'] \
                 or sensorfault_config_name not in configs['SensorfaultConfigs']:
             return None
 
-        # Read Sensor Config
-        sensor_config = lxml.etree.parse(os.path.join(self.path, 'sensors', f'{sensor_config_name}.xml')).getroot()
-        mask = {}
-        for config in sensor_config:
-            mask[config.tag] = []
-            for sensor in config:
-                mask[config.tag].append(sensor.attrib['id'])
-        
-        # Create path for measurements
-        measurements_path = os.path.join(self.path, 'measurements', leak_config)
+        mask, column_indices = self._get_sensor_config(sensor_config_name)
+        seed, sensorfaults = self._get_sensorfault_config(sensorfault_config_name)
+        return leak_config, mask, column_indices, seed, sensorfaults
 
-        # Check, if data is present as csv, alternatively assume pkl.
-        if os.path.exists(os.path.join(measurements_path, 'demand.csv')):
-            # Read measurements from csv
-            data = {
-                'demand': pd.read_csv(os.path.join(measurements_path, 'demand.csv'), index_col='time').loc[:,mask['DemandSensors']],
-                'flow': pd.read_csv(os.path.join(measurements_path, 'flow.csv'), index_col='time').loc[:,mask['FlowSensors']],
-                'pressure': pd.read_csv(os.path.join(measurements_path, 'pressure.csv'), index_col='time').loc[:,mask['PressureSensors']]
-            }
-        else:
-            # Read measurements from pkl
-            data = {
-                'demand': pd.read_pickle(os.path.join(measurements_path, 'demand.pkl')).loc[:,mask['DemandSensors']],
-                'flow': pd.read_pickle(os.path.join(measurements_path, 'flow.pkl')).loc[:,mask['FlowSensors']],
-                'pressure': pd.read_pickle(os.path.join(measurements_path, 'pressure.pkl')).loc[:,mask['PressureSensors']]
-            }
+    def _get_with_parsed(self, leak_config, mask, column_indices, seed, sensorfaults, measurements=None):
+        """
+        Retrieve specific measurements from this scenario, using already parsed configs.
 
-        # Read and apply Sensorfault config
-        sensorfault_config = lxml.etree.parse(os.path.join(self.path, 'sensorfaults', f'{sensorfault_config_name}.xml')).getroot()
+        :param leak_config: The name of the leak config
+        :param mask: The sensor ids of the sensor config, grouped by sensor type
+        :param column_indices: The column positions of the sensor ids in the measurement data frames
+        :param seed: The random seed of the sensorfault config
+        :param sensorfaults: A list of dictionaries containing the sensorfault information
+        :param measurements: Already read measurements of the leak config, which contain at least the sensors of the mask.
+            If None, they are read using _get_measurements.
+        :returns: A dictionary of measurement data frames
+        """
+
+        if measurements is None:
+            measurements = self._get_measurements(leak_config, mask)
+
+        # Select the sensors from the measurements.
+        # The selections are new data frames, applying sensorfaults does not modify the given or cached measurements.
+        data = {
+            'demand': measurements['demand'].loc[:,mask['DemandSensors']],
+            'flow': measurements['flow'].loc[:,mask['FlowSensors']],
+            'pressure': measurements['pressure'].loc[:,mask['PressureSensors']]
+        }
 
         # Create a numpy rng object to get repeatable 'normal' type faults.
-        # Hash the sensor config file's contents as random seed
-        with open(os.path.join(self.path, 'sensorfaults', f'{sensorfault_config_name}.xml')) as f:
-            sensorfault_config_text = f.read()
-        seed = int(hashlib.sha1(sensorfault_config_text.encode("utf-8")).hexdigest(), 16)
+        # The seed is the same for every call with this sensorfault config.
         rng = np.random.default_rng(seed)
 
-        # Iterate through all sensorfaults
-        for config in sensorfault_config:
-            part_id = config.attrib['partId']
-            sensor_type = config.attrib['sensorType']
+        # Sensorfaults are applied to a copy of each faulty measurement frame's values,
+        # which is created on first use. Column positions are looked up by sensor id.
+        arrays = {}
+
+        # Iterate through all sensorfaults of the sensorfault config and apply them
+        for attrib in sensorfaults:
+            part_id = attrib['partId']
+            sensor_type = attrib['sensorType']
 
             # Check if sensorfault is relevant for current sensor config
-            if part_id not in data[sensor_type].columns:
+            column_index = column_indices[sensor_type].get(part_id)
+            if column_index is None:
                 continue
 
             # Read sensorfault details
-            start = int(config.attrib['start'])
-            end = int(config.attrib['end'])
-            fault_type = config.attrib['faultType']
-            fault_param = float(config.attrib['faultParam']) if 'faultParam' in config.attrib.keys() else None
+            start = int(attrib['start'])
+            end = int(attrib['end'])
+            fault_type = attrib['faultType']
+            fault_param = float(attrib['faultParam']) if 'faultParam' in attrib else None
 
             # Make sure that the fault parameter is not None, except for stuckzero faults
             if fault_param is None and fault_type != 'stuckzero':
                 print(f'ScenarioLoader: Missing fault parameter for {fault_type} fault on {part_id}! Skipping...')
                 continue
 
-            # Apply sensorfault to data
-            data[sensor_type].loc[:,part_id] = _apply_sensorfault(data[sensor_type].loc[:,part_id], start, end, fault_type, fault_param, rng)
+            # Apply sensorfault to the column's values
+            if sensor_type not in arrays:
+                arrays[sensor_type] = data[sensor_type].to_numpy(copy=True)
+            _apply_sensorfault(arrays[sensor_type][:,column_index], start, end, fault_type, fault_param, rng)
+
+        # Replace the faulty measurement frames, the measurements of each sensor type share one dtype
+        for sensor_type, values in arrays.items():
+            df = data[sensor_type]
+            data[sensor_type] = pd.DataFrame(values, index=df.index, columns=df.columns, copy=False)
 
         return data
 
+    def _get_measurements(self, leak_config, mask):
+        """
+        Read the measurements of a leak config, which contain at least the sensors of a mask.
+
+        :param leak_config: The name of the leak config
+        :param mask: The sensor ids to read, grouped by sensor type
+        :returns: A dictionary of measurement data frames
+        """
+
+        # Create path for measurements
+        measurements_path = os.path.join(self.path, 'measurements', leak_config)
+
+        # Check, if data is present as csv or parquet, alternatively assume pkl.
+        if not os.path.exists(os.path.join(measurements_path, 'demand.csv')) \
+                and os.path.exists(os.path.join(measurements_path, 'demand.parquet')):
+            # Parquet files are stored by column, so only the selected sensors are read
+            return {
+                'demand': pd.read_parquet(os.path.join(measurements_path, 'demand.parquet'), columns=mask['DemandSensors']),
+                'flow': pd.read_parquet(os.path.join(measurements_path, 'flow.parquet'), columns=mask['FlowSensors']),
+                'pressure': pd.read_parquet(os.path.join(measurements_path, 'pressure.parquet'), columns=mask['PressureSensors'])
+            }
+
+        # Csv and pkl measurements are read completely and cached
+        return self._read_measurements_cached(leak_config)
+
+    def _read_measurements(self, leak_config):
+        """
+        Read all csv or pkl measurements of a leak config, bypassing the cache.
+
+        :param leak_config: The name of the leak config
+        :returns: A dictionary of measurement data frames containing all sensors
+        """
+
+        # Create path for measurements
+        measurements_path = os.path.join(self.path, 'measurements', leak_config)
+
+        # Check, if data is present as csv, alternatively assume pkl.
+        if os.path.exists(os.path.join(measurements_path, 'demand.csv')):
+            # Read measurements from csv
+            return {
+                'demand': pd.read_csv(os.path.join(measurements_path, 'demand.csv'), index_col='time'),
+                'flow': pd.read_csv(os.path.join(measurements_path, 'flow.csv'), index_col='time'),
+                'pressure': pd.read_csv(os.path.join(measurements_path, 'pressure.csv'), index_col='time')
+            }
+        else:
+            # Read measurements from pkl
+            return {
+                'demand': pd.read_pickle(os.path.join(measurements_path, 'demand.pkl')),
+                'flow': pd.read_pickle(os.path.join(measurements_path, 'flow.pkl')),
+                'pressure': pd.read_pickle(os.path.join(measurements_path, 'pressure.pkl'))
+            }
+
+    def _get_sensorfault_config(self, sensorfault_config_name):
+        """
+        Retrieve the random seed and the sensorfaults of a sensorfault config.
+        The sensorfault config is only read on the first call.
+
+        :param sensorfault_config_name: The name of the sensorfault config
+        :returns: A tuple of the random seed and a list of dictionaries containing the sensorfault information
+        """
+
+        if sensorfault_config_name not in self._sensorfault_configs:
+            # Read the sensorfault config once, it is both hashed and parsed
+            with open(os.path.join(self.path, 'sensorfaults', f'{sensorfault_config_name}.xml'), 'rb') as f:
+                sensorfault_config_bytes = f.read()
+
+            # Hash the sensorfault config file's contents as random seed
+            seed = int.from_bytes(hashlib.sha1(sensorfault_config_bytes).digest(), 'big')
+            sensorfaults = list(_iter_attributes(io.BytesIO(sensorfault_config_bytes), 'Sensorfault'))
+            self._sensorfault_configs[sensorfault_config_name] = (seed, sensorfaults)
+
+        return self._sensorfault_configs[sensorfault_config_name]
+
+    def _get_sensor_config(self, sensor_config_name):
+        """
+        Retrieve the sensor ids of a sensor config and their column positions in the measurement data frames.
+        The sensor config is only parsed on the first call.
+
+        :param sensor_config_name: The name of the sensor config
+        :returns: A tuple of a dictionary of sensor types, e.g. PressureSensors, containing lists of sensor ids,
+            and a dictionary of measurements, e.g. pressure, containing dictionaries of sensor ids and column positions
+        """
+
+        if sensor_config_name not in self._sensor_configs:
+            sensor_config = lxml.etree.parse(os.path.join(self.path, 'sensors', f'{sensor_config_name}.xml')).getroot()
+            mask = {}
+            for config in sensor_config:
+                mask[config.tag] = []
+                for sensor in config:
+                    mask[config.tag].append(sensor.attrib['id'])
+
+            # The measurement data frames contain the sensors in the order of the sensor config
+            column_indices = {
+                'demand': {sensor_id: i for i, sensor_id in enumerate(mask['DemandSensors'])},
+                'flow': {sensor_id: i for i, sensor_id in enumerate(mask['FlowSensors'])},
+                'pressure': {sensor_id: i for i, sensor_id in enumerate(mask['PressureSensors'])}
+            }
+            self._sensor_configs[sensor_config_name] = (mask, column_indices)
+
+        return self._sensor_configs[sensor_config_name]
+
+
+def _iter_attributes(source, tag):
+    """
+    Stream the attributes of all elements with a given tag from an xml file.
+    Each element is cleared after its attributes are copied, so the whole tree is never kept in memory.
+    This is a utility function designed to be used by the Scenario class.
 
-def _apply_sensorfault(df, start, end, fault_type, fault_param, rng):
+    :param source: The path to the xml file, or a file object
+    :param tag: The tag of the elements to read, e.g. Leak
+    :returns: A generator of attribute dictionaries
+    """
+    for _, element in lxml.etree.iterparse(source, events=('end',), tag=tag):
+        attrib = dict(element.attrib)
+        # Drop the element and its already processed siblings
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+        yield attrib
+
+def _list_entries(path, suffix=None):
     """
-    Apply a sensorfault to the given measurements.
+    List the entries of a directory with a single scan.
     This is a utility function designed to be used by the Scenario class.
 
-    :param df: Dataframe of measurements to apply the fault to
+    :param path: Path of the directory
+    :param suffix: If given, list files with this suffix and remove it from their names, otherwise list subdirectories
+    :returns: A list of entry names
+    """
+    with os.scandir(path) as entries:
+        if suffix is None:
+            return [entry.name for entry in entries if entry.is_dir()]
+        return [entry.name[:-len(suffix)] for entry in entries if entry.name.endswith(suffix) and entry.is_file()]
+
+def _cache_size(variable):
+    """
+    Read a cache size from an environment variable.
+    This is a utility function designed to be used by the ScenarioCollection and Scenario classes.
+
+    :param variable: Name of the environment variable
+    :returns: The cache size, 0 if the variable is not set or not a non-negative integer
+    """
+    value = os.environ.get(variable, '').strip()
+    if not value:
+        return 0
+    try:
+        cache_size = int(value)
+    except ValueError:
+        cache_size = -1
+    if cache_size < 0:
+        print(f'ScenarioLoader: Invalid cache size "{value}" in {variable}, expected a non-negative integer! Disabling cache...')
+        return 0
+    return cache_size
+
+def _apply_sensorfault(values, start, end, fault_type, fault_param, rng):
+    """
+    Apply a sensorfault to the given measurements in place.
+    This is a utility function designed to be used by the Scenario class.
+
+    :param values: Numpy array of the measurements of one sensor to apply the fault to
     :param start: Start index of the fault
     :param end: End index of the fault
     :param fault_type: Type of the fault
     :param fault_param: Parameter of the fault
     :param rng: Numpy rng object, to ensure repeatable random faults
-    :returns: The measurement dataframe with the sensorfaults applied
     """
-    # Apply each fault according to its type
-    if fault_type == 'constant':
-        df.iloc[start:end] = fault_param
-    elif fault_type == 'drift':
-        step = np.arange(end-start) + 1
-        df.iloc[start:end] += fault_param * step
-    elif fault_type == 'normal':
-        df.iloc[start:end] += rng.normal(1, fault_param, size=end-start)
-    elif fault_type == 'percentage':
-        df.iloc[start:end] *= fault_param
-    elif fault_type == 'shift':
-        df.iloc[start:end] += fault_param
-    elif fault_type == 'stuckzero':
-        df.iloc[start:end] = 0
-    else:
+    # Look up the fault function according to the fault type
+    fault_fn = _FAULT_FNS.get(fault_type)
+    if fault_fn is None:
         print(f'ScenarioLoader: Trying to apply invalid sensor fault type: {fault_type}')
-
-    return df
+        return
+
+    fault_fn(values, start, end, fault_param, rng)
+
+# Fault functions by fault type, each modifies values[start:end] in place.
+# Faults are computed in double precision and stored in the dtype of the measurements.
+def _constant(values, start, end, fault_param, rng):
+    values[start:end] = fault_param
+
+def _drift(values, start, end, fault_param, rng):
+    window = values[start:end]
+    drift = np.arange(1, window.shape[0] + 1, dtype=np.float64)
+    drift *= fault_param
+    window += drift
+
+def _normal(values, start, end, fault_param, rng):
+    # Same draws as rng.normal(1, fault_param), scaled in place without a second array
+    noise = rng.standard_normal(end-start)
+    noise *= fault_param
+    noise += 1
+    values[start:end] += noise
+
+def _percentage(values, start, end, fault_param, rng):
+    values[start:end] *= fault_param
+
+def _shift(values, start, end, fault_param, rng):
+    values[start:end] += fault_param
+
+def _stuckzero(values, start, end, fault_param, rng):
+    values[start:end] = 0
+
+_FAULT_FNS = {
+    'constant': _constant,
+    'drift': _drift,
+    'normal': _normal,
+    'percentage': _percentage,
+    'shift': _shift,
+    'stuckzero': _stuckzero
+}
@@ -2,207 +2,265 @@ import tempfile
 import wntr
 import plotly
 import itertools
+import collections
 import os
 import sys
 import argparse
 import lxml.etree
-
-
-def plot_network(wn, leaks, sensorfaults, pressure_sensors, flow_sensors, demand_sensors, out_file, auto_open, plot_name):
+import numpy as np
+
+# Compiled config schema, loaded on first use by _get_schema
+_SCHEMA = None
+
+# Compiled XPath expressions to read the visualized configs from a config.
+# Configs are looked up relative to their scenario element and sensors relative to their sensor config,
+# $name is bound to the requested scenario or config name.
+_SCENARIO_XPATH = lxml.etree.XPath('Scenario[@name=$name]')
+_LEAK_CONFIG_XPATH = lxml.etree.XPath('LeakConfigs/LeakConfig[@name=$name]')
+_SENSORFAULT_CONFIG_XPATH = lxml.etree.XPath('SensorfaultConfigs/SensorfaultConfig[@name=$name]')
+_SENSOR_CONFIG_XPATH = lxml.etree.XPath('SensorConfigs/SensorConfig[@name=$name]')
+_PRESSURE_SENSORS_XPATH = lxml.etree.XPath('PressureSensors/Sensor/@id')
+_FLOW_SENSORS_XPATH = lxml.etree.XPath('FlowSensors/Sensor/@id')
+_DEMAND_SENSORS_XPATH = lxml.etree.XPath('DemandSensors/Sensor/@id')
+
+# Sensor types that are located on nodes and on edges
+_NODE_SENSOR_TYPES = frozenset({'pressure', 'demand'})
+_EDGE_SENSOR_TYPES = frozenset({'flow'})
+
+# Popup templates of a single sensorfault and leak, filled with the attributes of the sensorfault or leak
+# and its number i. Optional attributes have to be defaulted by the caller.
+_SENSORFAULT_POPUP = (
+    '\n    Fault {i}: <br>'
+    '\n        Type: {sensorType} <br>'
+    '\n        Start Time: {start} <br>'
+    '\n        End Time: {end} <br>'
+    '\n        Fault Type: {faultType} <br> '
+    '\n        Fault Param: {faultParam} <br>')
+_LEAK_POPUP = (
+    '     Leak {i}: <br>         Start Time: {start} <br>'
+    '\n        End Time: {end} <br>'
+    '\n        Diameter: {diameter} <br>'
+    '\n        Leak Type: {type} <br>'
+    '\n        Peak Time: {peak} <br>')
+
+
+def plot_network(wn, leaks, sensorfaults, pressure_sensors, flow_sensors, demand_sensors, out_file, auto_open, plot_name, offline=False):
     """
     Plot the given network including leaks, sensors and sensor faults.
 
     :param wn: Water network to plot
     :param leaks: List of leaks to plot
     :param sensorfaults: List of sensorfaults to plot
-    :param pressure_sensors: List of pressure sensors to plot
-    :param flow_sensors: List of flow sensors to plot
-    :param demand_sensors: List of demand sensors to plot
+    :param pressure_sensors: Set of pressure sensors to plot
+    :param flow_sensors: Set of flow sensors to plot
+    :param demand_sensors: Set of demand sensors to plot
     :param out_file: File to write the plot to
     :param auto_open: Boolean declaring if file should automatically be opened
     :param plot_name: Title of the plot
+    :param offline: Boolean declaring if plotly.js should be embedded in the file, otherwise it is loaded from a CDN
     """
 
-    # Extract Graph from water network
+    # Extract Graph and node coordinates from water network
     wn_graph = wn.get_graph()
+    pos = dict(wn_graph.nodes(data='pos'))
+    node_indices = {node: i for i, node in enumerate(pos)}
+    positions = np.array(list(pos.values()), dtype=np.float64).reshape(-1, 2)
+
+    # Index leaks and sensorfaults by the part they are occurring on
+    node_leaks = collections.defaultdict(list)
+    edge_leaks = collections.defaultdict(list)
+    for leak in leaks:
+        if 'nodeId' in leak:
+            node_leaks[leak['nodeId']].append(leak)
+        if 'pipeId' in leak:
+            edge_leaks[leak['pipeId']].append(leak)
+    node_sensorfaults = collections.defaultdict(list)
+    edge_sensorfaults = collections.defaultdict(list)
+    for sensorfault in sensorfaults:
+        if sensorfault['sensorType'] in _NODE_SENSOR_TYPES:
+            node_sensorfaults[sensorfault['partId']].append(sensorfault)
+        elif sensorfault['sensorType'] in _EDGE_SENSOR_TYPES:
+            edge_sensorfaults[sensorfault['partId']].append(sensorfault)
+
+    # Skip the lookups of the loops below for empty configs, e.g. for plain network files
+    have_node_leaks = bool(node_leaks)
+    have_edge_leaks = bool(edge_leaks)
+    have_node_sensorfaults = bool(node_sensorfaults)
+    have_edge_sensorfaults = bool(edge_sensorfaults)
+    have_pressure_sensors = bool(pressure_sensors)
+    have_flow_sensors = bool(flow_sensors)
+    have_demand_sensors = bool(demand_sensors)
+
+    # Collect all edges once, so the node indices of the edges can be preallocated
+    edges = list(itertools.chain(wn.pipes(), wn.pumps(), wn.valves()))
+    n_edges = len(edges)
 
     # Initialize edge information to plot
-    edge_xs = []
-    edge_ys = []
-    edge_colors = []
-    edge_label_xs = []
-    edge_label_ys = []
-    edge_label_labels = []
-    edge_label_popups = []
+    edge_starts = np.empty(n_edges, dtype=np.intp)
+    edge_ends = np.empty(n_edges, dtype=np.intp)
+    edge_colors = [None] * n_edges
+    edge_label_labels = [edge_name for edge_name, _ in edges]
+    edge_label_popups = [None] * n_edges
 
     # Add all edges
-    for edge_name, edge in itertools.chain(wn.pipes(), wn.pumps(), wn.valves()):
-
-        # Extract coordinates
-        x0, y0 = wn_graph.nodes[edge.start_node_name]['pos']
-        x1, y1 = wn_graph.nodes[edge.end_node_name]['pos']
+    for e, (edge_name, edge) in enumerate(edges):
 
         # Create Label
         edge_color = '#BBB'
-        popup_text = f'##### {wn.get_link(edge_name).link_type} #####<br>ID: {edge_name}<br>'
+        popup_parts = [f'##### {edge.link_type} #####<br>ID: {edge_name}<br>']
 
         # Add flow sensors to label
-        if edge_name in flow_sensors:
+        if have_flow_sensors and edge_name in flow_sensors:
             edge_color = '#0F0'
-            popup_text += 'Flow Sensor<br>'
+            popup_parts.append('Flow Sensor<br>')
 
         # Add sensorfaults to label
-        cur_sensorfaults = get_sensorfaults_for(edge_name, 'edge', sensorfaults)
+        cur_sensorfaults = edge_sensorfaults.get(edge_name, []) if have_edge_sensorfaults else []
         if len(cur_sensorfaults) > 0:
             edge_color = '#F00'
-            popup_text += '### Sensorfaults ### <br>'
+            popup_parts.append('### Sensorfaults ### <br>')
             for i, sensorfault in enumerate(cur_sensorfaults):
-                fault_param = sensorfault['faultParam'] if 'faultParam' in sensorfault.keys() else '-'
-                popup_text += f'''
-    Fault {i}: <br>
-        Type: {sensorfault["sensorType"]} <br>
-        Start Time: {sensorfault["start"]} <br>
-        End Time: {sensorfault["end"]} <br>
-        Fault Type: {sensorfault["faultType"]} <br> 
-        Fault Param: {fault_param} <br>'''
+                popup_parts.append(_SENSORFAULT_POPUP.format_map({'faultParam': '-', **sensorfault, 'i': i}))
 
         # Add leaks to label
-        cur_leaks = get_leaks_for(edge_name, 'edge', leaks)
+        cur_leaks = edge_leaks.get(edge_name, []) if have_edge_leaks else []
         if len(cur_leaks) > 0:
             edge_color = '#00F'
-            popup_text += '### Leaks ### <br>'
+            popup_parts.append('### Leaks ### <br>')
             for i, leak in enumerate(cur_leaks):
-                peak_time = leak['peak'] if 'peak' in leak.keys() else '-'
-                popup_text += f''' \
-    Leak {i}: <br> \
-        Start Time: {leak["start"]} <br>
-        End Time: {leak["end"]} <br>
-        Diameter: {leak["diameter"]} <br>
-        Leak Type: {leak["type"]} <br>
-        Peak Time: {peak_time} <br>'''
+                popup_parts.append(_LEAK_POPUP.format_map({'peak': '-', **leak, 'i': i}))
 
         # Append render information
-        edge_xs += [x0, x1]
-        edge_ys += [y0, y1]
-        edge_label_xs.append((x0+x1)/2)
-        edge_label_ys.append((y0+y1)/2)
-        edge_label_labels.append(edge_name)
-        edge_label_popups.append(popup_text)
-        edge_colors.append(edge_color)
-
-    # Define traces for each edge
-    edge_traces = [ plotly.graph_objs.Scatter(
-        x=edge_xs[i*2:i*2+2],
-        y=edge_ys[i*2:i*2+2],
-        mode='lines',
-        line={
-            'width': 1,
-            'color': edge_colors[i]
-        }) for i in range(len(edge_colors))]
+        edge_starts[e] = node_indices[edge.start_node_name]
+        edge_ends[e] = node_indices[edge.end_node_name]
+        edge_label_popups[e] = ''.join(popup_parts)
+        edge_colors[e] = edge_color
+
+    # Compute the edge geometry for all edges at once
+    edge_lines, edge_label_positions = _assemble_edges(positions, edge_starts, edge_ends)
+
+    # Define a trace for the edges of each color.
+    # Traces and layout are plain dicts, which plotly does not need to validate.
+    # Coordinates are passed as float arrays, which are serialized faster than lists.
+    edge_color_array = np.array(edge_colors)
+    edge_traces = []
+    for edge_color in dict.fromkeys(edge_colors):
+        color_lines = edge_lines[edge_color_array == edge_color].reshape(-1, 2)
+        edge_traces.append({
+            'type': 'scatter',
+            'x': color_lines[:, 0],
+            'y': color_lines[:, 1],
+            'mode': 'lines',
+            'line': {
+                'width': 1,
+                'color': edge_color
+            }})
     
-    # Define a trace for the edge labels
-    edge_label_trace = plotly.graph_objs.Scatter(
-        x=edge_label_xs,
-        y=edge_label_ys,
-        text=edge_label_labels,
-        hovertext=edge_label_popups,
-        textposition="middle center",
-        hoverinfo='text',
-        mode='markers+text',
-        marker={
-            'color': edge_colors,
-            'opacity': 0
-        })
-
-    # Initialize node information to plot
-    node_xs = []
-    node_ys = []
-    node_labels = []
-    node_popups = []
-    node_colors = []
+    # Define a trace for the edge labels at the edge midpoints, which also carries the edge popups.
+    # Only the labels are drawn, the popups are colored like their edge.
+    edge_label_trace = {
+        'type': 'scatter',
+        'x': edge_label_positions[:, 0],
+        'y': edge_label_positions[:, 1],
+        'text': edge_label_labels,
+        'hovertext': edge_label_popups,
+        'textposition': 'middle center',
+        'hovertemplate': '%{hovertext}<extra></extra>',
+        'hoverlabel': {
+            'bgcolor': edge_colors
+        },
+        'mode': 'text'}
+
+    # Initialize node information to plot, in the order of the node positions
+    n_nodes = len(node_indices)
+    node_labels = list(node_indices)
+    node_popups = [None] * n_nodes
+    node_colors = [None] * n_nodes
 
     # Add all nodes to the plot data
-    for node in wn_graph.nodes():
-        x, y = wn_graph.nodes[node]['pos']
+    for n, (node, node_type) in enumerate(wn_graph.nodes(data='type')):
         node_color = '#888'
-        popup_text = f'##### {wn.get_node(node).node_type} #####<br>ID: {node}<br>'
+        popup_parts = [f'##### {node_type} #####<br>ID: {node}<br>']
 
         # Add pressure sensors
-        if node in pressure_sensors:
-            popup_text += 'Pressure Sensor<br>'
+        if have_pressure_sensors and node in pressure_sensors:
+            popup_parts.append('Pressure Sensor<br>')
             node_color = '#0F0'
 
         # Add demand sensors
-        if node in demand_sensors:
-            popup_text += 'Demand Sensor<br>'
+        if have_demand_sensors and node in demand_sensors:
+            popup_parts.append('Demand Sensor<br>')
             node_color = '#0F0'
 
         # Add sensorfaults to label
-        cur_sensorfaults = get_sensorfaults_for(node, 'node', sensorfaults)
+        cur_sensorfaults = node_sensorfaults.get(node, []) if have_node_sensorfaults else []
         if len(cur_sensorfaults) > 0:
             node_color = '#F00'
-            popup_text += '### Sensorfaults ### <br>'
+            popup_parts.append('### Sensorfaults ### <br>')
             for i, sensorfault in enumerate(cur_sensorfaults):
-                fault_param = sensorfault['faultParam'] if 'faultParam' in sensorfault.keys() else '-'
-                popup_text += f'''
-    Fault {i}: <br>
-        Type: {sensorfault["sensorType"]} <br>
-        Start Time: {sensorfault["start"]} <br>
-        End Time: {sensorfault["end"]} <br>
-        Fault Type: {sensorfault["faultType"]} <br> 
-        Fault Param: {fault_param} <br>'''
+                popup_parts.append(_SENSORFAULT_POPUP.format_map({'faultParam': '-', **sensorfault, 'i': i}))
 
         # Add leaks to label
-        cur_leaks = get_leaks_for(node, 'node', leaks)
+        cur_leaks = node_leaks.get(node, []) if have_node_leaks else []
         if len(cur_leaks) > 0:
             node_color = '#F00'
-            popup_text += '### Leaks ### <br>'
+            popup_parts.append('### Leaks ### <br>')
             for i, leak in enumerate(cur_leaks):
-                peak_time = leak['peak'] if 'peak' in leak.keys() else '-'
-                popup_text += f''' \
-    Leak {i}: <br> \
-        Start Time: {leak["start"]} <br>
-        End Time: {leak["end"]} <br>
-        Diameter: {leak["diameter"]} <br>
-        Leak Type: {leak["type"]} <br>
-        Peak Time: {peak_time} <br>'''
+                popup_parts.append(_LEAK_POPUP.format_map({'peak': '-', **leak, 'i': i}))
 
         # Append render information
-        node_xs.append(x)
-        node_ys.append(y)
-        node_labels.append(node)
-        node_popups.append(popup_text)
-        node_colors.append(node_color)
+        node_popups[n] = ''.join(popup_parts)
+        node_colors[n] = node_color
     
     # Define a trace for the nodes
-    node_trace = plotly.graph_objs.Scatter(
-        x=node_xs,
-        y=node_ys,
-        text=node_labels,
-        hovertext=node_popups,
-        textposition="top center",
-        hoverinfo='text',
-        mode='markers+text',
-        marker={
+    node_trace = {
+        'type': 'scatter',
+        'x': positions[:, 0],
+        'y': positions[:, 1],
+        'text': node_labels,
+        'hovertext': node_popups,
+        'textposition': 'top center',
+        'hoverinfo': 'text',
+        'mode': 'markers+text',
+        'marker': {
             'color': node_colors
-        })
+        }}
 
-    # Create figure
+    # Create figure, the default template has to be set explicitly without validation
     data = edge_traces + [edge_label_trace, node_trace]
-    layout = plotly.graph_objs.Layout(
-                    title=plot_name,
-                    titlefont=dict(size=16),
+    layout = dict(
+                    title=dict(text=plot_name, font=dict(size=16)),
                     showlegend=False,
                     width=1600,
                     height=800,
                     hovermode='closest',
                     margin=dict(b=20,l=5,r=5,t=40),
                     xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                    yaxis=dict(showgrid=False, zeroline=False, showticklabels=False))
+                    yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+                    template=plotly.io.templates[plotly.io.templates.default].to_plotly_json())
 
-    # Plot figure
-    fig = plotly.graph_objs.Figure(data=data,layout=layout)
-    plotly.offline.plot(fig, filename=out_file, auto_open=auto_open)
+    # Plot figure, unless requested otherwise plotly.js is not embedded to keep the file small
+    fig = dict(data=data, layout=layout)
+    plotly.offline.plot(fig, filename=out_file, auto_open=auto_open, include_plotlyjs=True if offline else 'cdn', validate=False)
+
+def _assemble_edges(positions, starts, ends):
+    """
+    Compute the line and label coordinates of edges.
+
+    :param positions: Array of node coordinates with shape (number of nodes, 2)
+    :param starts: Indices of the start nodes of the edges
+    :param ends: Indices of the end nodes of the edges
+    :returns: Array of shape (number of edges, 3, 2) containing start, end and a NaN separator for each edge,
+        Array of shape (number of edges, 2) containing the edge midpoints
+    """
+    start_positions = positions[np.asarray(starts, dtype=np.intp)]
+    end_positions = positions[np.asarray(ends, dtype=np.intp)]
+
+    lines = np.full((len(start_positions), 3, 2), np.nan)
+    lines[:, 0] = start_positions
+    lines[:, 1] = end_positions
+
+    return lines, (start_positions + end_positions) / 2
 
 def get_leaks_for(name, type, leaks):
     """
@@ -214,15 +272,9 @@ def get_leaks_for(name, type, leaks):
     :returns: Leaks that are occurring on the given part
     """
     if type == 'node':
-        return list(filter(lambda leak: \
-                'nodeId' in leak.keys() \
-            and leak['nodeId'] == name \
-            , leaks))
+        return [leak for leak in leaks if leak.get('nodeId') == name]
     else:
-        return list(filter(lambda leak: \
-                'pipeId' in leak.keys() \
-            and leak['pipeId'] == name \
-            , leaks))
+        return [leak for leak in leaks if leak.get('pipeId') == name]
 
 def get_sensorfaults_for(name, type, sensorfaults):
     """
@@ -233,16 +285,9 @@ def get_sensorfaults_for(name, type, sensorfaults):
     :param sensorfaults: List of sensorfaults to extract from
     :returns: Sensorfaults that are occurring on the given part
     """
-    if type == 'node':
-        return list(filter(lambda fault: \
-                fault['partId'] == name \
-            and fault['sensorType'] in ['pressure', 'demand']\
-            , sensorfaults))
-    else:
-        return list(filter(lambda fault: \
-                fault['partId'] == name \
-            and fault['sensorType'] in ['flow']\
-            , sensorfaults))
+    sensor_types = _NODE_SENSOR_TYPES if type == 'node' else _EDGE_SENSOR_TYPES
+    return [fault for fault in sensorfaults
+            if fault['partId'] == name and fault['sensorType'] in sensor_types]
 
 def read_config(config_path, scenario_name, leak_config_name, sensor_config_name, sensorfault_config_name):
     """
@@ -253,13 +298,12 @@ def read_config(config_path, scenario_name, leak_config_name, sensor_config_name
     :param leak_config_name: Name of the Leak Config
     :param sensor_config_name: Name of the Sensor Config
     :param sensorfault_config_name: Name of the Sensorfault Config
-    :returns: Path to the network file, List of leaks, List of sensorfaults, List of pressure sensors, List of flow sensors, List of demand sensors
+    :returns: Path to the network file, List of leaks, List of sensorfaults, Set of pressure sensors, Set of flow sensors, Set of demand sensors
     """
 
     # Read in config and schema
     xml_doc = lxml.etree.parse(config_path)
-    xml_schema_doc = lxml.etree.parse(os.path.join(os.path.dirname(__file__), 'config_schema.xsd'))
-    xml_schema = lxml.etree.XMLSchema(xml_schema_doc)
+    xml_schema = _get_schema()
 
     # Remove comments from element tree
     comments = xml_doc.xpath('//comment()')
@@ -276,49 +320,60 @@ def read_config(config_path, scenario_name, leak_config_name, sensor_config_name
         sys.exit(1)
 
     # Extract info from XML
-    # Network name
-    network_file = next(iter(xml_doc.xpath(f'Scenario[@name="{scenario_name}"]/@network')), None)
-    if network_file is None:
+    # Locate the scenario once, all configs are read from its element
+    scenario = next(iter(_SCENARIO_XPATH(xml_doc, name=scenario_name)), None)
+    if scenario is None:
         print(f'[ERROR] The specified Scenario "{scenario_name}" does not exist in the specified config.')
         sys.exit(1)
+
+    # Network name
+    network_file = scenario.get('network')
     if not os.path.isabs(network_file):
         network_file = os.path.join(os.path.dirname(config_path), network_file)
 
     # Extract Leaks
-    leaks_exist = len(xml_doc.xpath(f'Scenario[@name="{scenario_name}"]/LeakConfigs/LeakConfig[@name="{leak_config_name}"]')) > 0
-    leaks_xml = xml_doc.xpath(f'Scenario[@name="{scenario_name}"]/LeakConfigs/LeakConfig[@name="{leak_config_name}"]/Leak')
-    leaks = xml_to_dict_list(leaks_xml)
+    leak_config = next(iter(_LEAK_CONFIG_XPATH(scenario, name=leak_config_name)), None)
 
     # Check if Leak config exists
-    if not leaks_exist:
+    if leak_config is None:
         print(f'[ERROR] The specified Leak Config "{leak_config_name}" does not exist in the specified config.')
         sys.exit(1)
+    leaks = xml_to_dict_list(leak_config.findall('Leak'))
 
-    
     # Extract Sensorfaults
-    sensorfaults_exist = len(xml_doc.xpath(f'Scenario[@name="{scenario_name}"]/SensorfaultConfigs/SensorfaultConfig[@name="{sensorfault_config_name}"]')) > 0
-    sensorfaults_xml = xml_doc.xpath(f'Scenario[@name="{scenario_name}"]/SensorfaultConfigs/SensorfaultConfig[@name="{sensorfault_config_name}"]/Sensorfault')
-    sensorfaults = xml_to_dict_list(sensorfaults_xml)
+    sensorfault_config = next(iter(_SENSORFAULT_CONFIG_XPATH(scenario, name=sensorfault_config_name)), None)
 
     # Check if Sensorfault config exists
-    if not sensorfaults_exist:
+    if sensorfault_config is None:
         print(f'[ERROR] The specified Sensorfault Config "{sensorfault_config_name}" does not exist in the specified config.')
         sys.exit(1)
-    
+    sensorfaults = xml_to_dict_list(sensorfault_config.findall('Sensorfault'))
+
     # Extract Sensors
-    sensorfaults_exist = len(xml_doc.xpath(f'Scenario[@name="{scenario_name}"]/SensorConfigs/SensorConfig[@name="{sensor_config_name}"]')) > 0
-    pressure_sensors = xml_doc.xpath(f'Scenario[@name="{scenario_name}"]/SensorConfigs/SensorConfig[@name="{sensor_config_name}"]/PressureSensors/Sensor/@id')
-    flow_sensors = xml_doc.xpath(f'Scenario[@name="{scenario_name}"]/SensorConfigs/SensorConfig[@name="{sensor_config_name}"]/FlowSensors/Sensor/@id')
-    demand_sensors = xml_doc.xpath(f'Scenario[@name="{scenario_name}"]/SensorConfigs/SensorConfig[@name="{sensor_config_name}"]/DemandSensors/Sensor/@id')
+    sensor_config = next(iter(_SENSOR_CONFIG_XPATH(scenario, name=sensor_config_name)), None)
 
     # Check if Sensor config exits
-    if not sensorfaults_exist:
+    if sensor_config is None:
         print(f'[ERROR] The specified Sensor Config "{sensor_config_name}" does not exist in the specified config.')
         sys.exit(1)
+    pressure_sensors = set(_PRESSURE_SENSORS_XPATH(sensor_config))
+    flow_sensors = set(_FLOW_SENSORS_XPATH(sensor_config))
+    demand_sensors = set(_DEMAND_SENSORS_XPATH(sensor_config))
 
     # Return parsed data
     return network_file, leaks, sensorfaults, pressure_sensors, flow_sensors, demand_sensors
 
+def _get_schema():
+    """
+    Retrieve the compiled config schema, it is only parsed and compiled on the first call.
+
+    :returns: The config schema as lxml XMLSchema
+    """
+    global _SCHEMA
+    if _SCHEMA is None:
+        _SCHEMA = lxml.etree.XMLSchema(lxml.etree.parse(os.path.join(os.path.dirname(__file__), 'config_schema.xsd')))
+    return _SCHEMA
+
 def xml_to_dict_list(xml_list):
     """
     Helper function to convert a list of xml elements into a list of dicts
@@ -327,10 +382,7 @@ def xml_to_dict_list(xml_list):
     :returns: A list of dictionaries containing the nodes' attributes
     """
 
-    lst = []
-    for xml in xml_list:
-        lst.append({key: xml.attrib[key] for key in xml.attrib.iterkeys()})
-    return lst
+    return [dict(xml.attrib) for xml in xml_list]
 
 def run(args):
     """
@@ -346,6 +398,7 @@ def run(args):
     sensor_config_name = args.sensor_config_name
     sensorfault_config_name = args.sensorfault_config_name
     output = args.output
+    offline = args.offline
 
     # Check if given config or network file exists
     if not os.path.exists(config_or_network):
@@ -358,7 +411,7 @@ def run(args):
 
         # For network files, there are no leaks, faults, or sensors
         network_file = config_or_network
-        leaks, sensorfaults, pressure_sensors, flow_sensors, demand_sensors = [], [], [], [], []
+        leaks, sensorfaults, pressure_sensors, flow_sensors, demand_sensors = [], [], set(), set(), set()
         plot_name = config_or_network
 
     elif file_type == 'xml':
@@ -390,7 +443,7 @@ def run(args):
     # Graph the network
     plot_network(wn, leaks=leaks, sensorfaults=sensorfaults, \
         pressure_sensors=pressure_sensors, flow_sensors=flow_sensors, demand_sensors=demand_sensors, \
-        out_file=output, auto_open=auto_open, plot_name=plot_name)
+        out_file=output, auto_open=auto_open, plot_name=plot_name, offline=offline)
 
 def configure_parser(parser):
     """
@@ -405,6 +458,7 @@ def configure_parser(parser):
     parser.add_argument('sensor_config_name', nargs='?', help='Name of the Sensor Config, ignored if Network file is given')
     parser.add_argument('sensorfault_config_name', nargs='?', help='Name of the Sensorfault Config, ignored if Network file is given')
     parser.add_argument('-o', '--output', action='store', nargs='?', help='Html file to write visualization, leave empty to display only')
+    parser.add_argument('--offline', action='store_true', help='Embed plotly.js in the html file, so it can be viewed without internet access. By default it is loaded from a CDN')
 
 def main():
     """
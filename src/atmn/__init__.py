@@ -1,2 +1,14 @@
 # Expose Scenario and ScenarioCollection at top level
-from .ScenarioLoader import Scenario, ScenarioCollection
\ No newline at end of file
+# They are imported on first access, so that the command line tools do not
+# load pandas before it is needed
+__all__ = ['Scenario', 'ScenarioCollection']
+
+def __getattr__(name):
+    if name in __all__:
+        from . import ScenarioLoader
+        return getattr(ScenarioLoader, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+# The lazy exports are not module attributes yet, list them for dir() and tab completion
+def __dir__():
+    return __all__
@@ -0,0 +1,248 @@
+import os
+import zipfile
+import itertools
+import concurrent.futures
+import numpy as np
+from xml.sax.saxutils import escape, quoteattr
+
+# Minimal xlsx writer for numeric data frames. The worksheet XML is generated
+# directly from the underlying numpy arrays, one formatted string per row,
+# instead of passing every single cell through a spreadsheet library.
+
+_CONTENT_TYPES = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">\
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>\
+<Default Extension="xml" ContentType="application/xml"/>\
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>\
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>\
+{sheets}</Types>'''
+
+_CONTENT_TYPE_SHEET = '<Override PartName="/xl/worksheets/sheet{id}.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+
+_RELS = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">\
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>\
+</Relationships>'''
+
+_WORKBOOK = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">\
+<sheets>{sheets}</sheets></workbook>'''
+
+_WORKBOOK_SHEET = '<sheet name={name} sheetId="{id}" r:id="rId{id}"/>'
+
+_WORKBOOK_RELS = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">\
+{sheets}<Relationship Id="rIdStyles" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>\
+</Relationships>'''
+
+_WORKBOOK_RELS_SHEET = '<Relationship Id="rId{id}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet{id}.xml"/>'
+
+# Style 0 is the default, style 1 is used for header and index cells (bold, border, centered)
+_STYLES = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">\
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>\
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>\
+<borders count="2"><border><left/><right/><top/><bottom/><diagonal/></border>\
+<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border></borders>\
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>\
+<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>\
+<xf numFmtId="0" fontId="1" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" applyAlignment="1">\
+<alignment horizontal="center" vertical="top"/></xf></cellXfs>\
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>\
+</styleSheet>'''
+
+_SHEET_START = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'''
+
+_SHEET_END = '</sheetData></worksheet>'
+
+# Maximum number of rows and columns of an excel sheet
+_MAX_ROWS = 1048576
+_MAX_COLUMNS = 16384
+
+# Minimum number of cells before sheets are serialized in parallel processes,
+# below that the process startup outweighs the gain
+_PARALLEL_MIN_CELLS = 10**6
+
+
+def supports(df):
+    """
+    Check whether a data frame can be written by this module, i.e. whether its
+    values and index are all numeric.
+
+    :param df: The data frame in question
+    :returns: True if the data frame is purely numeric
+    """
+
+    return _is_real(df.index.dtype) and all(_is_real(dtype) for dtype in df.dtypes)
+
+def check_sheet_size(df):
+    """
+    Check that a data frame fits into an excel sheet, including header row and index column.
+
+    :param df: The data frame in question
+    :raises ValueError: If the data frame exceeds the maximum number of rows or columns
+    """
+
+    if df.shape[0] + 1 > _MAX_ROWS or df.shape[1] + 1 > _MAX_COLUMNS:
+        raise ValueError(f'This sheet is too large! Your sheet size is: {df.shape[0] + 1}, {df.shape[1] + 1} '
+                         f'Max sheet size is: {_MAX_ROWS}, {_MAX_COLUMNS}')
+
+def write_xlsx(path, sheets):
+    """
+    Write numeric data frames to an xlsx file, one sheet per data frame.
+    The layout matches the pandas excel export: the index is written to the
+    first column, header and index cells are bold.
+
+    :param path: Path to the output xlsx file
+    :param sheets: A dictionary of sheet names and data frames
+    :raises ValueError: If a data frame does not fit into an excel sheet, see check_sheet_size
+    """
+
+    # Excel refuses to open sheets beyond its size limits, check them before anything is written
+    for df in sheets.values():
+        check_sheet_size(df)
+
+    ids = range(1, len(sheets) + 1)
+
+    # Measurement sheets usually share the same time index, in that case
+    # it is converted to strings only once and reused for every sheet
+    indices = [df.index for df in sheets.values()]
+    if indices and all(index.equals(indices[0]) for index in indices[1:]):
+        index = _format_index(indices[0])
+    else:
+        index = None
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as xlsx:
+        # Static package parts
+        xlsx.writestr('[Content_Types].xml', _CONTENT_TYPES.format(
+            sheets=''.join(_CONTENT_TYPE_SHEET.format(id=i) for i in ids)))
+        xlsx.writestr('_rels/.rels', _RELS)
+        xlsx.writestr('xl/workbook.xml', _WORKBOOK.format(
+            sheets=''.join(_WORKBOOK_SHEET.format(name=quoteattr(name), id=i) for i, name in zip(ids, sheets.keys()))))
+        xlsx.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS.format(
+            sheets=''.join(_WORKBOOK_RELS_SHEET.format(id=i) for i in ids)))
+        xlsx.writestr('xl/styles.xml', _STYLES)
+
+        # Worksheets are independent of each other. For large workbooks they are
+        # serialized in worker processes, otherwise streamed into the archive.
+        n_workers = min(len(sheets), os.cpu_count() or 1)
+        if n_workers > 1 and sum(df.size for df in sheets.values()) >= _PARALLEL_MIN_CELLS:
+            with concurrent.futures.ProcessPoolExecutor(n_workers) as executor:
+                sheet_xmls = executor.map(_sheet_xml, sheets.values(), itertools.repeat(index))
+                for i, sheet_xml in zip(ids, sheet_xmls):
+                    xlsx.writestr(f'xl/worksheets/sheet{i}.xml', sheet_xml)
+        else:
+            for i, df in zip(ids, sheets.values()):
+                with xlsx.open(f'xl/worksheets/sheet{i}.xml', 'w') as sheet:
+                    for chunk in _iter_sheet_xml(df, index):
+                        sheet.write(chunk.encode('utf-8'))
+
+def format_values(values):
+    """
+    Convert numeric values to strings in their shortest representation.
+    Floats are widened to float64 first, so the exact stored values are written,
+    e.g. "68.3125" for a float16 68.3125 instead of its float16 shortest form "68.3".
+
+    :param values: A numpy array of integers or floats
+    :returns: A numpy array of strings
+    """
+
+    if np.issubdtype(values.dtype, np.floating):
+        values = values.astype(np.float64)
+    return values.astype(str)
+
+def _sheet_xml(df, index=None):
+    """
+    Serialize a numeric data frame to worksheet XML.
+    This is the unit of work for parallel serialization.
+
+    :param df: The data frame to convert
+    :param index: The formatted index of the data frame, if already known
+    :returns: The worksheet XML as bytes
+    """
+
+    return ''.join(_iter_sheet_xml(df, index)).encode('utf-8')
+
+def _iter_sheet_xml(df, index=None):
+    """
+    Generate the worksheet XML of a numeric data frame.
+
+    :param df: The data frame to convert
+    :param index: The formatted index of the data frame, if already known
+    :returns: A generator of XML strings
+    """
+
+    letters = [_column_letter(j) for j in range(df.shape[1] + 1)]
+
+    # Numbers are converted in C to their shortest representation, see format_values.
+    # Columns are converted separately, so integer columns are not widened.
+    if index is None:
+        index = _format_index(df.index)
+    columns = [df.iloc[:, j].to_numpy() for j in range(df.shape[1])]
+    finite = np.ones(df.shape[0], dtype=bool)
+    for column in columns:
+        finite &= np.isfinite(column)
+    values = np.column_stack([format_values(column) for column in columns]) if columns \
+        else np.empty((df.shape[0], 0), dtype=str)
+
+    # Prebuilt template for rows without missing values,
+    # placeholder 0 is the row number, 1 the index, 2.. the values
+    row_template = '<row r="{0}"><c r="A{0}" s="1"><v>{1}</v></c>' \
+        + ''.join(f'<c r="{letter}{{0}}"><v>{{{j}}}</v></c>' for j, letter in enumerate(letters[1:], start=2)) \
+        + '</row>'
+
+    yield _SHEET_START
+
+    # Header
+    header = [df.index.name, *df.columns]
+    yield '<row r="1">' + ''.join(
+        f'<c r="{letter}1" t="inlineStr" s="1"><is><t>{escape(str(name))}</t></is></c>'
+        for letter, name in zip(letters, header) if name is not None) + '</row>'
+
+    # Rows
+    for r, (idx, row, row_finite) in enumerate(zip(index, values, finite), start=2):
+        if row_finite:
+            yield row_template.format(r, idx, *row)
+        else:
+            # Missing values are left empty
+            yield f'<row r="{r}"><c r="A{r}" s="1"><v>{idx}</v></c>' + ''.join(
+                f'<c r="{letter}{r}"><v>{v}</v></c>'
+                for letter, v in zip(letters[1:], row) if v not in ('nan', 'inf', '-inf')) + '</row>'
+
+    yield _SHEET_END
+
+def _format_index(index):
+    """
+    Convert the values of a numeric index to strings.
+
+    :param index: The index to convert
+    :returns: A numpy array of strings
+    """
+
+    return format_values(index.to_numpy())
+
+def _is_real(dtype):
+    """
+    Check whether a dtype is an integer or floating point type.
+
+    :param dtype: The dtype in question
+    :returns: True for integer and floating point types
+    """
+
+    return np.issubdtype(dtype, np.integer) or np.issubdtype(dtype, np.floating)
+
+def _column_letter(j):
+    """
+    Convert a zero based column number to its excel column letter.
+
+    :param j: Zero based column number
+    :returns: The column letter, e.g. "A" for 0 or "AA" for 26
+    """
+
+    letter = ''
+    j += 1
+    while j > 0:
+        j, remainder = divmod(j - 1, 26)
+        letter = chr(65 + remainder) + letter
+    return letter